@@ -5,15 +5,28 @@ import numpy as np
 from datetime import datetime
 import firebase_admin
 from firebase_admin import credentials, firestore,initialize_app
-import io
 import json
 import os
 import calendar
 from dotenv import load_dotenv
-from sheets_backup import append_to_sheet
+from sheets_backup import SheetBackupSink, append_rows_to_sheet, configure as configure_sheets, upsert_rows_to_sheet
+from firestore_sync import RecordMirror, employee_doc_id, normalize_code, period_collection, period_key
+from firestore_bulk import bulk_delete
+from write_queue import WriteBehindQueue
+from save_journal import SaveJournal
+from record_cache import RecordCache
+from roster_import import ROSTER_TYPES, content_digest, read_roster
+from punch_import import PUNCH_TYPES, pair_punches, read_punches, roster_days
+from ot_engine import STATUSES, compute_days, compute_roster, month_totals, night_shift, ot_from_minutes
+from minute_time import MISSING, duration, format_hhmm, parse_hhmm
+from excel_export import records_digest, write_xlsx
+from record_schema import DAY_DEFAULTS, day_fields, from_columnar, layout_fields, read_record, records_frame, to_columnar
 load_dotenv()  # Loads .env in local dev
 
 import ast
+import base64
+import hashlib
+import re
 # other imports remain the same...
 def _extract_json_like(s: str) -> str | None:
     if not isinstance(s, str):
@@ -30,73 +43,77 @@ def _normalize_private_key(key_dict):
         key_dict["private_key"] = key_dict["private_key"].replace("\\n", "\n")
     return key_dict
 
-def load_json_key(key_name):
-    """
-    Robust loader for JSON-like secrets from st.secrets or env vars.
-    Returns a dict or raises a RuntimeError with helpful preview.
-    """
-    # 1) Try Streamlit secrets
-    if key_name in st.secrets:
-        val = st.secrets[key_name]
-        if isinstance(val, dict):
-            return _normalize_private_key(val)
-        if isinstance(val, str):
-            # Try direct JSON
-            try:
-                parsed = json.loads(val)
-                return _normalize_private_key(parsed)
-            except Exception:
-                pass
-            # Try extracting {...} and parsing
-            extracted = _extract_json_like(val)
-            if extracted:
-                try:
-                    parsed = json.loads(extracted)
-                    return _normalize_private_key(parsed)
-                except Exception:
-                    pass
-            # Try Python literal eval
-            try:
-                parsed = ast.literal_eval(val)
-                return _normalize_private_key(parsed)
-            except Exception:
-                if extracted:
-                    try:
-                        parsed = ast.literal_eval(extracted)
-                        return _normalize_private_key(parsed)
-                    except Exception:
-                        pass
-            preview = repr(val)[:1000]
-            raise RuntimeError(
-                f"{key_name} in st.secrets could not be parsed as JSON or Python literal.\n"
-                f"Preview (first 1000 chars):\n{preview}\n\n"
-                "Hint: place valid JSON in secrets.toml (wrap with triple quotes) or provide the env var."
-            )
-        # unexpected type
-        raise RuntimeError(f"{key_name} found in st.secrets but is not dict/string (type={type(val)}).")
-
-    # 2) Fallback: environment variable
-    env_val = os.getenv(key_name)
-    if not env_val:
-        return None
-    # attempt same strategies on env var
+_BASE64_KEY = re.compile(r"[A-Za-z0-9+/=\s]+")
+
+def _parse_key_string(key_name, val, source):
+    """json -> {...} extract -> Python literal, for secrets pasted in odd shapes."""
     try:
-        parsed = json.loads(env_val)
-        return _normalize_private_key(parsed)
+        return json.loads(val)
     except Exception:
         pass
-    extracted = _extract_json_like(env_val)
+    # Try extracting {...} and parsing
+    extracted = _extract_json_like(val)
     if extracted:
         try:
-            parsed = json.loads(extracted)
-            return _normalize_private_key(parsed)
+            return json.loads(extracted)
         except Exception:
             pass
+    # Try Python literal eval
     try:
-        parsed = ast.literal_eval(env_val)
-        return _normalize_private_key(parsed)
+        return ast.literal_eval(val)
     except Exception as e:
-        raise RuntimeError(f"{key_name} exists in env but is not valid JSON/dict: {e}")
+        if extracted:
+            try:
+                return ast.literal_eval(extracted)
+            except Exception:
+                pass
+        if source == "env":
+            raise RuntimeError(f"{key_name} exists in env but is not valid JSON/dict: {e}")
+        preview = repr(val)[:1000]
+        raise RuntimeError(
+            f"{key_name} in st.secrets could not be parsed as JSON or Python literal.\n"
+            f"Preview (first 1000 chars):\n{preview}\n\n"
+            "Hint: place valid JSON in secrets.toml (wrap with triple quotes) or provide the env var."
+        )
+
+@st.cache_resource(show_spinner=False)
+def _parse_json_key(key_name, digest, source, _val):
+    """Parsed once per process per secret value (`digest`); reruns reuse the dict."""
+    if isinstance(_val, dict):
+        return _normalize_private_key(dict(_val))
+    text = _val.strip()
+    if not text.startswith("{") and _BASE64_KEY.fullmatch(text):
+        # Base64 blob from convert_key.py / encode.py: decode directly
+        try:
+            return _normalize_private_key(json.loads(base64.b64decode(text)))
+        except Exception:
+            pass
+    return _normalize_private_key(_parse_key_string(key_name, _val, source))
+
+def load_json_key(key_name):
+    """
+    Robust loader for JSON-like secrets from st.secrets or env vars.
+    Returns a dict or raises a RuntimeError with helpful preview.
+    """
+    # 1) Try Streamlit secrets
+    if key_name in st.secrets:
+        val = st.secrets[key_name]
+        if isinstance(val, dict):
+            raw = json.dumps(val, sort_keys=True, default=str)
+        elif isinstance(val, str):
+            raw = val
+        else:
+            # unexpected type
+            raise RuntimeError(f"{key_name} found in st.secrets but is not dict/string (type={type(val)}).")
+        source = "secrets"
+    else:
+        # 2) Fallback: environment variable
+        val = raw = os.getenv(key_name)
+        if not val:
+            return None
+        source = "env"
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    return _parse_json_key(key_name, digest, source, val)
 
 # ---- Load keys ----
 sheets_key = load_json_key("SHEETS_KEY")
@@ -108,55 +125,28 @@ if sheets_key is None:
 if firebase_key is None:
     st.error("❌ Failed to load FIREBASE_KEY from secrets or .env.")
     st.stop()
-cred = credentials.Certificate(firebase_key)
 # ---- Create credentials and init Firebase ----
-# ✅ Initialize Firebase App safely
-try:
-    firebase_admin.get_app()
-except ValueError:
-    firebase_admin.initialize_app(cred)
+@st.cache_resource(show_spinner=False)
+def get_firestore_client(_firebase_key, digest):
+    """One Firebase app + Firestore client per process; its gRPC channel stays warm across reruns."""
+    # ✅ Initialize Firebase App safely
+    try:
+        firebase_admin.get_app()
+    except ValueError:
+        firebase_admin.initialize_app(credentials.Certificate(_firebase_key))
+    client = firestore.client()
+    if os.getenv("FIRESTORE_DEBUG_DUMP"):
+        # Opt-in connectivity check: prints the test collection once per process
+        for doc in client.collection('test_collection').stream():
+            print(f'{doc.id} => {doc.to_dict()}')
+    return client
 
 # ✅ Initialize Firestore DB
-db = firestore.client()
-
-docs = db.collection('test_collection').stream()
-for doc in docs:
-    print(f'{doc.id} => {doc.to_dict()}')
-
-
-
-try:
-    # Convert HH:MM to float-style number
-    ci = float(ci_str.replace(":", "."))
-    co = float(co_str.replace(":", "."))
-
-    # Handle overnight shift
-    if co < ci:
-        co += 24.0
-
-    # Treat check-in/out as float numbers, then calculate worked time
-    worked_time = round(co - ci, 2)
-    raw_ot = worked_time - 8
-
-    # OT calculation logic
-    if raw_ot <= 0.4:
-        ot = 0
-    elif 0.5 <= raw_ot <= 0.7:
-        ot = 0.5
-    elif 0.8 <= raw_ot <= 1.0:
-        ot = 1
-    else:
-        ot = round(raw_ot * 2) / 2
-
-    # Night shift check
-    night_shift = is_night_shift(ci_str, co_str)
+db = get_firestore_client(firebase_key, hashlib.sha256(json.dumps(firebase_key, sort_keys=True).encode()).hexdigest())
 
-except:
-    st.warning(" Please enter valid time in HH:MM format.")
-    ci_str, co_str, ot, night_shift = "09:00", "18:00", 0, False
 
-
-COLLECTION = "attendance_records"
+def active_period():
+    return period_key(st.session_state["year"], st.session_state["month"])
 
 st.set_page_config(page_title="Sheet1", layout="wide")
 st.title("📋 Employee Attendance Sheet Generator")
@@ -164,194 +154,355 @@ st.title("📋 Employee Attendance Sheet Generator")
 # 🔧 Firestore helpers
 def reset_firestore():
     try:
-        docs = db.collection(COLLECTION).stream()
-        for doc in docs:
-            db.collection(COLLECTION).document(doc.id).delete()
+        queue = get_write_queue()
+        queue.flush()
+        # Queued Firestore saves must land before the delete, not after it (a Sheets failure is harmless here)
+        if queue.pending()["firestore"]:
+            st.error(f"❌ Reset cancelled: queued saves could not be written ({queue.last_error}). "
+                     "Try again once they are flushed.")
+            return
+        bar = st.progress(0.0, text="🧹 Deleting records...")
+
+        def report(deleted, total):
+            fraction = min(deleted / total, 1.0) if total else 0.0
+            bar.progress(fraction, text=f"🧹 Deleted {deleted}{f' / {total}' if total else ''} records...")
+
+        deleted = bulk_delete(db, period_collection(db, active_period()), progress=report)
+        get_record_mirror(active_period()).reset()
+        month, year = st.session_state["month"], st.session_state["year"]
         st.session_state.clear()
-        st.success("✅ Firestore data reset successfully.")
+        # The month/year selectors below read these, so keep the month that was just reset
+        st.session_state["month"], st.session_state["year"] = month, year
+        st.success(f"✅ Firestore data reset successfully ({deleted} records removed).")
     except Exception as e:
-        st.error(f"❌ Firestore reset error: {e}")
+        get_record_mirror(active_period()).reset()
+        st.error(f"❌ Firestore reset error: {e}. Click reset again to delete the remaining records.")
+
+@st.cache_resource
+def get_record_cache():
+    # Survives restarts: a cold process serves the last snapshot and pulls only what changed since.
+    return RecordCache(os.getenv("ATTENDANCE_CACHE", "attendance_cache.sqlite3"))
+
+@st.cache_resource
+def get_record_mirror(period):
+    # One mirror per month per process: warmed from the disk cache (or one full stream), then only changed docs.
+    return RecordMirror(period_collection(db, period), cache=get_record_cache(), cache_key=period)
+
+@st.cache_resource
+def warm_record_mirrors():
+    # Once per process, at startup: every month with a disk snapshot is loaded before anyone opens it
+    return [period for period in get_record_cache().periods() if get_record_mirror(period).warm()]
 
-@st.cache_data(ttl=300)
 def fetch_firestore_records():
     try:
-        st.write("📡 Trying to connect to Firestore...")
-        docs = db.collection(COLLECTION).stream()
-        st.write("✅ Successfully fetched Firestore records.")
-        return {doc.id: doc.to_dict() for doc in docs}
+        return get_record_mirror(active_period()).records()
     except Exception as e:
         st.error(f"🔥 Error fetching Firestore data: {e}")
         return {}
 
+@st.cache_data(max_entries=4, show_spinner="📦 Building Excel...")
+def build_excel_export(digest, _records):
+    # Keyed by the content hash only; the records themselves are not hashed again.
+    return write_xlsx(_records)
+
 def convert_to_python_types(data):
     return {
         k: (int(v) if isinstance(v, (np.integer, np.int64)) else float(v) if isinstance(v, np.floating) else v)
         for k, v in data.items()
     }
 
-# ✅ Updated Only This Function
-def safe_save(index, data):
+@st.cache_resource
+def get_write_queue():
+    # Shared by every session in this process; flushes from a background thread.
+    configure_sheets(sheets_key)
+    # SHEETS_BACKUP_MODE=upsert keeps one row per employee per month instead of a growing log
+    writer = upsert_rows_to_sheet if os.getenv("SHEETS_BACKUP_MODE", "append") == "upsert" else append_rows_to_sheet
+    # Saves are journaled locally first, so a crash or network outage loses nothing
+    journal = SaveJournal(os.getenv("ATTENDANCE_JOURNAL", "attendance_journal.jsonl"))
+    return WriteBehindQueue(db, sheet_sink=SheetBackupSink(writer=writer), journal=journal)
+
+def safe_save(doc_id, data):
     clean_data = convert_to_python_types(data)
-    firestore_success = False
-    sheets_success = False
-    try:
-        db.collection(COLLECTION).document(str(index)).set(clean_data, merge=True)
-        firestore_success = True
-    except Exception as e:
-        st.warning(f"⚠️ Firestore save failed: {e}")
-    try:
-      append_to_sheet("Attendance_Backup", list(clean_data.values()))  # ✅ CORRECT
-      sheets_success = True
-    except Exception as e:
-        st.warning(f"⚠️ Google Sheets backup failed: {e}")
-
-    fetch_firestore_records.clear()
-
-    if not firestore_success and not sheets_success:
-        st.error("❌ Save failed. No backup was created.")
-    elif not firestore_success:
-        st.warning("✅ Saved to Google Sheets. But Firestore failed.")
-    elif not sheets_success:
-        st.warning("✅ Saved to Firebase. But Google Sheets backup failed.")
+    doc = to_columnar(clean_data)
+    doc_ref = period_collection(db, active_period()).document(doc_id)
+    # Firestore gets the compact columnar doc, the Sheets backup keeps the flat row in the fixed
+    # column layout (its rows have no header, sheets_restore recovers the columns from the length)
+    sheet_row = {**layout_fields(clean_data), "Period": active_period()}
+    get_write_queue().enqueue(doc_ref.path, doc, sheet_row=sheet_row, replace=True)
+    get_record_mirror(active_period()).apply_local(doc_id, doc, replace=True)
+
+@st.cache_data(max_entries=8, show_spinner="📄 Reading roster...")
+def load_roster(digest, filename, _data):
+    # Keyed by content hash: re-uploading the same file is free, a changed file is always re-read
+    return read_roster(_data, filename)
+
+@st.cache_data(max_entries=4, show_spinner="⏱️ Reading punch log...")
+def load_punches(digest, filename, _data):
+    return read_punches(_data, filename)
+
+def index_roster(employee_list):
+    """Doc id per roster position plus the reverse doc id -> position index."""
+    employee_ids = [employee_doc_id(code) for code in employee_list["Employee Code"]]
+    st.session_state["employee_ids"] = employee_ids
+    st.session_state["code_index"] = {doc_id: i for i, doc_id in enumerate(employee_ids)}
+
+def jump_to_code():
+    code = st.session_state.get("jump_code", "").strip()
+    if not code:
+        return
+    position = st.session_state.get("code_index", {}).get(employee_doc_id(code))
+    if position is None:
+        st.session_state["jump_error"] = f"⚠️ Employee Code {code} is not in the uploaded roster."
     else:
-        st.success("✅ Saved in both Firebase & Google Sheets")
-
-# 🔁 OT Logic
-
-def calculate_custom_ot(hours):
-    base = 8
-    raw_ot = hours - base
-    if raw_ot <= 0:
-        return 0
-    int_part = int(raw_ot)
-    decimal = raw_ot - int_part
-    decimal_str = f"{decimal:.2f}".split(".")[1]
-    if len(decimal_str.rstrip("0")) == 1:
-        dec = int(decimal_str[0])
-        if dec <= 4: return int_part
-        elif 5 <= dec <= 7: return int_part + 0.5
-        else: return int_part + 1
-    else:
-        dec = int(decimal_str[:2])
-        if dec <= 49: return int_part
-        elif 50 <= dec <= 70: return int_part + 0.5
-        else: return int_part + 1
-
-def time_str_to_float_str(time_str):
-    h, m = map(int, time_str.split(":"))
-    return float(f"{h}.{str(m).zfill(2)[0]}")
+        st.session_state["current_index"] = position
+    st.session_state["jump_code"] = ""
+
+def show_pending_writes():
+    queue = get_write_queue()
+    pending = queue.pending()
+    st.sidebar.metric("⏳ Pending Firestore writes", pending["firestore"])
+    st.sidebar.metric("⏳ Pending Sheets backups", pending["sheets"])
+    if queue.last_error:
+        st.sidebar.warning(f"⚠️ Last flush failed, retrying: {queue.last_error}")
+    if st.sidebar.button("📤 Flush now"):
+        if queue.flush():
+            st.sidebar.success("✅ Saved in both Firebase & Google Sheets")
+        else:
+            st.sidebar.error(f"❌ Flush failed: {queue.last_error}")
+
+# 🧮 Grid helpers: one vectorized pass instead of one widget set per day
+def sort_record(record):
+    return dict(sorted(record.items(), key=lambda x: (not x[0].startswith(('Employee', 'Total', 'OT')), x[0])))
+
+def month_days(record, days_in_month):
+    """Status / Check-in / Check-out per day with the same defaults as the per-day form."""
+    fields = day_fields(record, days_in_month)
+    return pd.DataFrame({field: fields[field] for field in DAY_DEFAULTS},
+                        index=[f"{day:02d}" for day in range(1, days_in_month + 1)])
+
+def apply_days(row_data, days_in_month, computed):
+    """Write computed day arrays into a flat record and refresh its totals."""
+    for i in range(days_in_month):
+        d = f"{i + 1:02d}"
+        row_data[f"{d}_Status"] = computed["status"][i]
+        row_data[f"{d}_Check-in"] = computed["check_in"][i]
+        row_data[f"{d}_Check-out"] = computed["check_out"][i]
+        row_data[f"{d}_OT"] = float(computed["ot"][i])
+        row_data[f"{d}_Night"] = "Yes" if computed["night"][i] else "No"
+    for day in range(days_in_month + 1, 32):
+        for key in ["Status", "Check-in", "Check-out", "OT", "Night"]:
+            row_data.pop(f"{day:02d}_{key}", None)
+    totals = month_totals(computed)
+    row_data.update({f"Total {code}": int(totals[f"Total {code}"]) for code in STATUSES})
+    row_data["OT Hours"] = float(totals["OT Hours"])
+    return row_data
 
-def is_night_shift(ci_str, co_str):
-    try:
-        ci = float(ci_str.replace(":", "."))
-        co = float(co_str.replace(":", "."))
-        if co < ci:
-            co += 24.0
-        return ci >= 20.0 or co <= 8.0
-    except:
-        return False
+if "month" not in st.session_state:
+    st.session_state["month"] = datetime.now().month
+if "year" not in st.session_state:
+    st.session_state["year"] = datetime.now().year
+warm_record_mirrors()
 
 # 📁 Upload Excel
-uploaded_file = st.file_uploader("📄 Upload Excel with 'Employee Code' & 'Employee Name'", type=["xlsx"])
+uploaded_file = st.file_uploader("📄 Upload Excel with 'Employee Code' & 'Employee Name'", type=ROSTER_TYPES)
 if st.button("🔄 Reset All Data"):
     reset_firestore()
+show_pending_writes()
 
-stored_data = fetch_firestore_records()
 current_index = int(st.session_state.get("current_index", 0))
 
 if uploaded_file:
-    if "uploaded_filename" not in st.session_state or st.session_state["uploaded_filename"] != uploaded_file.name:
-        st.session_state["uploaded_filename"] = uploaded_file.name
+    # file_id changes with every upload, even of a file with the same name
+    if st.session_state.get("uploaded_file_id") != uploaded_file.file_id:
+        st.session_state["uploaded_file_id"] = uploaded_file.file_id
         try:
-            df = pd.read_excel(uploaded_file)
-            df.columns = [col.strip() for col in df.columns]
-            if 'Employee Code' not in df.columns or 'Employee Name' not in df.columns:
-                st.error("❌ File must include 'Employee Code' and 'Employee Name")
-                st.stop()
-            employee_list = df[['Employee Code', 'Employee Name']].drop_duplicates().reset_index(drop=True)
+            data = uploaded_file.getvalue()
+            employee_list = load_roster(content_digest(data), uploaded_file.name, data)
+            if employee_list.attrs.get("blank_codes"):
+                st.warning(f"⚠️ {employee_list.attrs['blank_codes']} row(s) without an Employee Code were skipped.")
+            duplicated = employee_list["Employee Code"].duplicated()
+            if duplicated.any():
+                # Records are keyed by code, so repeated codes would overwrite each other
+                st.warning(f"⚠️ Duplicate Employee Codes kept once: "
+                           f"{', '.join(map(str, employee_list.loc[duplicated, 'Employee Code']))}")
+                employee_list = employee_list[~duplicated].reset_index(drop=True)
             st.session_state["employee_list"] = employee_list.to_dict("records")
             st.session_state["total_employees"] = len(employee_list)
+            index_roster(employee_list)
+        except ValueError as e:
+            st.session_state.pop("uploaded_file_id", None)
+            st.error(f"❌ {e}")
+            st.stop()
         except Exception as e:
+            st.session_state.pop("uploaded_file_id", None)
             st.error(f"❌ Failed to read Excel: {e}")
             st.stop()
 
-if "month" not in st.session_state:
-    st.session_state["month"] = datetime.now().month
-if "year" not in st.session_state:
-    st.session_state["year"] = datetime.now().year
-
 st.session_state["month"] = st.selectbox("🗓️ Month", list(range(1, 13)), index=st.session_state["month"] - 1)
 st.session_state["year"] = st.selectbox("📆 Year", list(range(2023, 2031)), index=st.session_state["year"] - 2023)
 
 employee_list = pd.DataFrame(st.session_state.get("employee_list", []))
-
-if not employee_list.empty and current_index < len(employee_list):
+if not employee_list.empty and "employee_ids" not in st.session_state:
+    index_roster(employee_list)
+employee_ids = st.session_state.get("employee_ids", [])
+days_in_month = calendar.monthrange(st.session_state["year"], st.session_state["month"])[1]
+stored_data = fetch_firestore_records()  # only the selected month's partition
+
+STATUS_COLUMN = st.column_config.SelectboxColumn("Status", options=STATUSES, required=True)
+
+# ⏱️ Punch-log import: a whole month of device punches for the roster in one pass
+if not employee_list.empty:
+    with st.expander("⏱️ Import punch log (Employee Code + Timestamp, or Date + Time)"):
+        punch_file = st.file_uploader("📄 Punch log", type=PUNCH_TYPES, key="punch_file")
+        if punch_file and st.button("📥 Import punches"):
+            try:
+                punches = load_punches(content_digest(punch_file.getvalue()), punch_file.name,
+                                       punch_file.getvalue())
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                st.stop()
+            except Exception as e:
+                st.error(f"❌ Failed to read punch log: {e}")
+                st.stop()
+            pairs = pair_punches(punches, st.session_state["year"], st.session_state["month"])
+            codes = [normalize_code(code) for code in employee_list["Employee Code"]]
+            records = [stored_data.get(doc_id) for doc_id in employee_ids]
+            status, check_in, check_out, punched = roster_days(pairs, codes, records, days_in_month)
+            computed = compute_roster(status, check_in, check_out)
+            rows = np.flatnonzero(punched.any(axis=1))
+            for i in rows:
+                emp = employee_list.iloc[i]
+                row_data = {"Employee Code": emp["Employee Code"], "Employee Name": emp["Employee Name"],
+                            **from_columnar(read_record(records[i]))}
+                apply_days(row_data, days_in_month, {k: v[i] for k, v in computed.items() if k != "totals"})
+                safe_save(employee_ids[i], row_data)
+            unknown = sorted(set(pairs["code"]) - set(codes))
+            incomplete = int((computed["invalid"] & punched).sum())
+            st.success(f"✅ Queued {len(rows)} employee(s) from {len(punches)} punches.")
+            if incomplete:
+                st.warning(f"⚠️ {incomplete} day(s) had no matching out-punch and were set to 09:00-18:00 with no OT.")
+            if unknown:
+                st.warning(f"⚠️ Codes not in the roster were skipped: {', '.join(unknown[:20])}"
+                           f"{' ...' if len(unknown) > 20 else ''}")
+            if punches.attrs.get("skipped"):
+                st.warning(f"⚠️ {punches.attrs['skipped']} row(s) with an unreadable timestamp were skipped.")
+
+entry_mode = st.radio("✏️ Entry mode", ["Per-day form", "Month grid", "Roster grid"], horizontal=True)
+
+if entry_mode == "Roster grid" and not employee_list.empty:
+    st.subheader("👥 Roster grid")
+    day_cols = [f"{day:02d}" for day in range(1, days_in_month + 1)]
+    records = [read_record(stored_data.get(doc_id)) for doc_id in employee_ids]
+    record_days = [day_fields(r, days_in_month) for r in records]
+    labels = [f"{e['Employee Code']} - {e['Employee Name']}" for e in employee_list.to_dict("records")]
+    originals, edited = {}, {}
+    tabs = st.tabs(["Status", "Check-in", "Check-out"])
+    for tab, field in zip(tabs, ["Status", "Check-in", "Check-out"]):
+        frame = pd.DataFrame([fields[field] for fields in record_days],
+                             index=labels, columns=day_cols)
+        config = {d: st.column_config.SelectboxColumn(d, options=STATUSES, required=True) for d in day_cols} \
+            if field == "Status" else None
+        with tab:
+            originals[field] = frame
+            edited[field] = st.data_editor(
+                frame, column_config=config, use_container_width=True,
+                key=f"roster_{field}_{st.session_state['year']}_{st.session_state['month']}")
+
+    computed = compute_roster(edited["Status"].to_numpy(), edited["Check-in"].to_numpy(),
+                              edited["Check-out"].to_numpy())
+    st.markdown("### Roster totals")
+    st.dataframe(computed["totals"].set_index(pd.Index(labels)), use_container_width=True)
+
+    if st.button("💾 Save roster"):
+        changed = np.zeros(len(employee_list), dtype=bool)
+        for field in originals:
+            changed |= (edited[field].to_numpy() != originals[field].to_numpy()).any(axis=1)
+        for i in np.flatnonzero(changed):
+            emp = employee_list.iloc[i]
+            row_data = {"Employee Code": emp["Employee Code"], "Employee Name": emp["Employee Name"],
+                        **from_columnar(records[i])}
+            apply_days(row_data, days_in_month, {k: v[i] for k, v in computed.items() if k != "totals"})
+            safe_save(employee_ids[i], row_data)
+        st.success(f"✅ Queued {int(changed.sum())} changed employee(s).")
+
+elif not employee_list.empty and current_index < len(employee_list):
+    st.text_input("🔎 Jump to Employee Code", key="jump_code", on_change=jump_to_code)
+    if "jump_error" in st.session_state:
+        st.warning(st.session_state.pop("jump_error"))
     emp = employee_list.iloc[current_index]
+    emp_id = employee_ids[current_index]
     st.subheader(f"🧑 {emp['Employee Name']} (Code: {emp['Employee Code']})")
 
-    days_in_month = calendar.monthrange(st.session_state["year"], st.session_state["month"])[1]
-    row_data = stored_data.get(str(current_index), {
+    row_data = from_columnar(stored_data.get(emp_id, {
         "Employee Code": emp["Employee Code"],
         "Employee Name": emp["Employee Name"]
-    }).copy()
-
-    total_ot = 0
-    c_P = c_A = c_L = c_WO = c_HL = c_PH = 0
-
-    for day in range(1, days_in_month + 1):
-        date_str = f"{day:02d}-{st.session_state['month']:02d}"
-        with st.expander(f"🗕️ Entry for {date_str}"):
-            status = st.selectbox(f"Status for {date_str}", ["P", "A", "L", "WO", "HL", "PH"],
-                                  key=f"status_{day}",
-                                  index=["P", "A", "L", "WO", "HL", "PH"].index(row_data.get(f"{day:02d}_Status", "P")))
-            if status == "P":
-                c_P += 1
-                default_ci = row_data.get(f"{day:02d}_Check-in", "09:00")
-                default_co = row_data.get(f"{day:02d}_Check-out", "18:00")
-                ci_str = st.text_input(f"⏰ Check-in ({date_str}) [HH:MM]", value=default_ci, key=f"ci_{day}")
-                co_str = st.text_input(f"⏰ Check-out ({date_str}) [HH:MM]", value=default_co, key=f"co_{day}")
-                try:
-                    ci = float(ci_str.replace(":", "."))
-                    co = float(co_str.replace(":", "."))
-                    if co < ci:
-                        co += 24.0
-                    hours = round(co - ci, 2)
-                    ot = calculate_custom_ot(hours)
-                    night_shift = is_night_shift(ci_str, co_str)
-                except:
-                    st.warning("⚠️ Please enter valid time in HH:MM format.")
-                    ci_str, co_str, ot, night_shift = "09:00", "18:00", 0, False
-                ci, co = ci_str, co_str
-                row_data[f"{day:02d}_Night"] = "Yes" if night_shift else "No"
-            else:
-                if status == "A": c_A += 1
-                elif status == "L": c_L += 1
-                elif status == "WO": c_WO += 1
-                elif status == "HL": c_HL += 1
-                elif status == "PH": c_PH += 1
-                ci = co = "00:00"
-                ot = 0
-                if status == "WO": co = "17:00"
-                if status == "HL": co = "13:00"
-                row_data[f"{day:02d}_Night"] = "No"
-
-            row_data[f"{day:02d}_Status"] = status
-            row_data[f"{day:02d}_Check-in"] = ci
-            row_data[f"{day:02d}_Check-out"] = co
-            row_data[f"{day:02d}_OT"] = ot
-            total_ot += ot
-
-    for day in range(days_in_month + 1, 32):
-        for key in ["Status", "Check-in", "Check-out", "OT", "Night"]:
-            row_data.pop(f"{day:02d}_{key}", None)
-
-    row_data.update({
-        "Total P": c_P, "Total A": c_A, "Total L": c_L,
-        "Total WO": c_WO, "Total HL": c_HL, "Total PH": c_PH,
-        "OT Hours": round(total_ot, 1)
-    })
-
-    sorted_row = dict(sorted(row_data.items(), key=lambda x: (not x[0].startswith(('Employee', 'Total', 'OT')), x[0])))
+    }))
+
+    if entry_mode == "Month grid":
+        grid = st.data_editor(
+            month_days(row_data, days_in_month), column_config={"Status": STATUS_COLUMN},
+            use_container_width=True,
+            key=f"grid_{current_index}_{st.session_state['year']}_{st.session_state['month']}")
+        computed = compute_days(grid["Status"], grid["Check-in"], grid["Check-out"])
+        if computed["invalid"].any():
+            bad_days = ", ".join(grid.index[computed["invalid"]])
+            st.warning(f"⚠️ Please enter valid time in HH:MM format (days {bad_days}).")
+        apply_days(row_data, days_in_month, computed)
+    else:
+        total_ot = 0
+        c_P = c_A = c_L = c_WO = c_HL = c_PH = 0
+
+        for day in range(1, days_in_month + 1):
+            date_str = f"{day:02d}-{st.session_state['month']:02d}"
+            with st.expander(f"🗕️ Entry for {date_str}"):
+                status = st.selectbox(f"Status for {date_str}", STATUSES,
+                                      key=f"status_{day}",
+                                      index=STATUSES.index(row_data.get(f"{day:02d}_Status", "P")))
+                if status == "P":
+                    c_P += 1
+                    default_ci = row_data.get(f"{day:02d}_Check-in", "09:00")
+                    default_co = row_data.get(f"{day:02d}_Check-out", "18:00")
+                    ci_str = st.text_input(f"⏰ Check-in ({date_str}) [HH:MM]", value=default_ci, key=f"ci_{day}")
+                    co_str = st.text_input(f"⏰ Check-out ({date_str}) [HH:MM]", value=default_co, key=f"co_{day}")
+                    ci_min, co_min = parse_hhmm(ci_str), parse_hhmm(co_str)
+                    if ci_min == MISSING or co_min == MISSING:
+                        st.warning("⚠️ Please enter valid time in HH:MM format.")
+                        ci_str, co_str, ot, night_shift_flag = "09:00", "18:00", 0, False
+                    else:
+                        ci_str, co_str = format_hhmm(ci_min), format_hhmm(co_min)
+                        ot = ot_from_minutes(duration(ci_min, co_min))
+                        night_shift_flag = night_shift(ci_min, co_min)
+                    ci, co = ci_str, co_str
+                    row_data[f"{day:02d}_Night"] = "Yes" if night_shift_flag else "No"
+                else:
+                    if status == "A": c_A += 1
+                    elif status == "L": c_L += 1
+                    elif status == "WO": c_WO += 1
+                    elif status == "HL": c_HL += 1
+                    elif status == "PH": c_PH += 1
+                    ci = co = "00:00"
+                    ot = 0
+                    if status == "WO": co = "17:00"
+                    if status == "HL": co = "13:00"
+                    row_data[f"{day:02d}_Night"] = "No"
+
+                row_data[f"{day:02d}_Status"] = status
+                row_data[f"{day:02d}_Check-in"] = ci
+                row_data[f"{day:02d}_Check-out"] = co
+                row_data[f"{day:02d}_OT"] = ot
+                total_ot += ot
+
+        for day in range(days_in_month + 1, 32):
+            for key in ["Status", "Check-in", "Check-out", "OT", "Night"]:
+                row_data.pop(f"{day:02d}_{key}", None)
+
+        row_data.update({
+            "Total P": c_P, "Total A": c_A, "Total L": c_L,
+            "Total WO": c_WO, "Total HL": c_HL, "Total PH": c_PH,
+            "OT Hours": round(total_ot, 1)
+        })
+
+    sorted_row = sort_record(row_data)
     st.markdown("### Preview Entry")
     st.dataframe(pd.DataFrame([sorted_row]), use_container_width=True)
 
@@ -363,7 +514,7 @@ if not employee_list.empty and current_index < len(employee_list):
                 st.rerun()
     with col2:
         if st.button("✅ Save & Next", key=f"btn_next_{current_index}"):
-            safe_save(current_index, row_data.copy())
+            safe_save(emp_id, row_data.copy())
             st.session_state["current_index"] = current_index + 1
             st.rerun()
 
@@ -371,17 +522,20 @@ stored_data = fetch_firestore_records()
 if stored_data:
     st.markdown("---")
     st.subheader("🗓️ Download Attendance Till Now")
-    sorted_records = []
-    for i in range(st.session_state.get("total_employees", 0)):
-        if str(i) in stored_data:
-            v = stored_data[str(i)]
-            sorted_v = dict(sorted(v.items(), key=lambda x: (not x[0].startswith(('Employee', 'Total', 'OT')), x[0])))
-            sorted_records.append(sorted_v)
+    # Roster order, one O(1) lookup per employee code
+    sorted_records = [stored_data[doc_id] for doc_id in st.session_state.get("employee_ids", [])
+                      if doc_id in stored_data]
 
     if sorted_records:
-        final_df = pd.DataFrame(sorted_records)
+        final_df = records_frame(sorted_records)
         st.dataframe(final_df, use_container_width=True)
-        towrite = io.BytesIO()
-        with pd.ExcelWriter(towrite, engine='xlsxwriter') as writer:
-            final_df.to_excel(writer, index=False, sheet_name="Attendance")
-        st.download_button("📥 Download Excel Till Now", data=towrite.getvalue(), file_name="attendance_upto_now.xlsx")
+        # The workbook is only built on request, and reused while the records are unchanged
+        if st.button("📦 Prepare Excel"):
+            st.session_state["export_digest"] = records_digest(sorted_records)
+        digest = st.session_state.get("export_digest")
+        if digest:
+            if digest != records_digest(sorted_records):
+                st.info("ℹ️ Records changed since the export was prepared. Click 'Prepare Excel' again.")
+            else:
+                st.download_button("📥 Download Excel Till Now", data=build_excel_export(digest, sorted_records),
+                                   file_name="attendance_upto_now.xlsx")
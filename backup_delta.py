@@ -0,0 +1,147 @@
+# 🔺 Incremental backups: per-employee field deltas between snapshots, with periodic full checkpoints
+#
+#   python backup_delta.py encode . backup_deltas          # convert attendance_backup*.json into a delta chain
+#   python backup_delta.py replay backup_deltas 12 out.json
+#   python backup_delta.py list backup_deltas
+import argparse
+import glob
+import json
+import os
+
+from backup_restore import SNAPSHOT_GLOB, snapshot_order
+
+_FILE = "{seq:08d}.{kind}.json"
+
+
+def diff_records(old, new):
+    """Field-level delta between two {key: record} dicts: changed/added fields, removed fields, removed keys."""
+    changed, dropped = {}, {}
+    for key, record in new.items():
+        before = old.get(key)
+        if before is None:
+            changed[key] = record
+            continue
+        fields = {field: value for field, value in record.items() if before.get(field, object()) != value}
+        gone = [field for field in before if field not in record]
+        if fields:
+            changed[key] = fields
+        if gone:
+            dropped[key] = gone
+    removed = [key for key in old if key not in new]
+    return {"changed": changed, "dropped_fields": dropped, "removed": removed}
+
+
+def apply_delta(records, delta):
+    """Apply a `diff_records` delta in place and return `records`."""
+    for key in delta.get("removed", []):
+        records.pop(key, None)
+    for key, fields in delta.get("dropped_fields", {}).items():
+        for field in fields:
+            records[key].pop(field, None)
+    for key, fields in delta.get("changed", {}).items():
+        records.setdefault(key, {}).update(fields)
+    return records
+
+
+class DeltaBackupWriter:
+    """
+    Writes a series of final_data_dict snapshots as one full checkpoint
+    followed by deltas against the previous snapshot, starting a new full
+    checkpoint every `checkpoint_every` snapshots (bounding replay length).
+    """
+
+    def __init__(self, directory, checkpoint_every=50):
+        self._directory = directory
+        self._checkpoint_every = checkpoint_every
+        os.makedirs(directory, exist_ok=True)
+        self._seq, self._since_full = 0, 0
+        self._state = None
+        existing = list_backups(directory)
+        if existing:
+            self._seq = existing[-1][0]
+            self._state = replay(directory, self._seq)["final_data_dict"]
+            self._since_full = self._seq - max(seq for seq, kind in existing if kind == "full")
+
+    def write(self, final_data_dict, current_index=None, source=None):
+        """Back up the current state; returns (seq, kind) of the file written."""
+        self._seq += 1
+        records = {str(key): dict(record) for key, record in final_data_dict.items()}
+        if self._state is None or self._since_full + 1 >= self._checkpoint_every:
+            kind, body = "full", {"final_data_dict": records}
+            self._since_full = 0
+        else:
+            kind, body = "delta", diff_records(self._state, records)
+            self._since_full += 1
+        body.update({"seq": self._seq, "current_index": current_index, "source": source})
+        path = os.path.join(self._directory, _FILE.format(seq=self._seq, kind=kind))
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(body, f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+        self._state = records
+        return self._seq, kind
+
+
+def list_backups(directory):
+    """[(seq, "full" | "delta")] in order."""
+    backups = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        parts = os.path.basename(path).split(".")
+        if len(parts) == 3 and parts[0].isdigit() and parts[1] in ("full", "delta"):
+            backups.append((int(parts[0]), parts[1]))
+    return sorted(backups)
+
+
+def replay(directory, seq=None):
+    """Rebuild snapshot `seq` (latest when None): nearest full checkpoint at or before it, then its deltas."""
+    backups = [(s, kind) for s, kind in list_backups(directory) if seq is None or s <= seq]
+    if not backups:
+        raise ValueError(f"No backup at or before {seq} in {directory}")
+    start = max(i for i, (_, kind) in enumerate(backups) if kind == "full")
+    records, current_index = {}, None
+    for s, kind in backups[start:]:
+        with open(os.path.join(directory, _FILE.format(seq=s, kind=kind)), encoding="utf-8") as f:
+            body = json.load(f)
+        if kind == "full":
+            records = body["final_data_dict"]
+        else:
+            apply_delta(records, body)
+        current_index = body.get("current_index")
+    return {"final_data_dict": records, "current_index": current_index}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta-encoded attendance backups.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    encode = commands.add_parser("encode", help="convert a folder of attendance_backup*.json into a delta chain")
+    encode.add_argument("directory")
+    encode.add_argument("output")
+    encode.add_argument("--checkpoint-every", type=int, default=50)
+    rebuild = commands.add_parser("replay", help="rebuild one snapshot as a JSON file")
+    rebuild.add_argument("output_dir")
+    rebuild.add_argument("seq", type=int)
+    rebuild.add_argument("output")
+    listing = commands.add_parser("list", help="backups in a delta chain")
+    listing.add_argument("output_dir")
+    args = parser.parse_args()
+
+    if args.command == "encode":
+        writer = DeltaBackupWriter(args.output, checkpoint_every=args.checkpoint_every)
+        paths = sorted(glob.glob(os.path.join(args.directory, SNAPSHOT_GLOB)), key=snapshot_order)
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            writer.write(data.get("final_data_dict") or {}, data.get("current_index"), os.path.basename(path))
+        before = sum(os.path.getsize(p) for p in paths)
+        after = sum(os.path.getsize(p) for p in glob.glob(os.path.join(args.output, "*.json")))
+        print(f"✅ Encoded {len(paths)} snapshots: {before} -> {after} bytes")
+    elif args.command == "replay":
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(replay(args.output_dir, args.seq), f, indent=2, ensure_ascii=False)
+        print(f"✅ Wrote {args.output}")
+    else:
+        for seq, kind in list_backups(args.output_dir):
+            print(f"{seq}\t{kind}")
+
+
+if __name__ == "__main__":
+    main()
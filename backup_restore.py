@@ -0,0 +1,162 @@
+# 🗄️ Offline restore from the attendance_backup*.json snapshots (final_data_dict + current_index)
+#
+#   python backup_restore.py .                              # index: employee code -> latest snapshot
+#   python backup_restore.py . --period 2025-07 --load      # latest state of everyone into Firestore
+#   python backup_restore.py . --period 2025-07 --upto 4900 --load   # state as of snapshot 4900
+#   python backup_restore.py --from-journal attendance_journal.jsonl --period 2025-07 --load   # app stopped
+import argparse
+import glob
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from firestore_sync import EMPLOYEES_COLLECTION, PERIODS_COLLECTION, employee_doc_id
+
+SNAPSHOT_GLOB = "attendance_backup*.json"
+_SNAPSHOT_NUMBER = re.compile(r"(\d+)\.json$")
+
+
+def snapshot_order(path):
+    """Sort key: the counter in `..._NNNN.json`, then modification time (the bare backup has no counter)."""
+    match = _SNAPSHOT_NUMBER.search(os.path.basename(path))
+    return (int(match.group(1)) if match else -1, os.path.getmtime(path))
+
+
+def parse_snapshot(path):
+    """
+    One snapshot -> {"path", "order", "current_index", "records": {code: record}}.
+
+    Runs in worker processes. Entries without an Employee Code (the old
+    In Time / Out Time layout) are skipped; an unreadable file yields an
+    empty snapshot with an "error".
+    """
+    snapshot = {"path": path, "order": snapshot_order(path), "current_index": None, "records": {}}
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        snapshot["error"] = str(e)
+        return snapshot
+    snapshot["current_index"] = data.get("current_index")
+    entries = data.get("final_data_dict") or {}
+    for key in sorted(entries, key=lambda k: int(k) if str(k).isdigit() else 0):
+        record = entries[key]
+        code = str(record.get("Employee Code", "")).strip() if isinstance(record, dict) else ""
+        if code:
+            snapshot["records"][code] = record
+    return snapshot
+
+
+def scan_snapshots(directory, workers=None):
+    """Parse every snapshot in `directory` on a process pool; oldest first."""
+    paths = glob.glob(os.path.join(directory, SNAPSHOT_GLOB))
+    if len(paths) < 2 or workers == 1:
+        snapshots = [parse_snapshot(p) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            snapshots = list(pool.map(parse_snapshot, paths, chunksize=max(1, len(paths) // 32)))
+    return sorted(snapshots, key=lambda s: s["order"])
+
+
+def build_index(snapshots):
+    """Employee code -> path of the newest snapshot holding that employee."""
+    index = {}
+    for snapshot in snapshots:  # oldest first, so newer snapshots overwrite
+        for code in snapshot["records"]:
+            index[code] = snapshot["path"]
+    return index
+
+
+def records_at(snapshots, upto=None):
+    """Latest record per employee code among snapshots numbered `upto` or lower (all when None)."""
+    records = {}
+    for snapshot in snapshots:
+        if upto is not None and snapshot["order"][0] > upto:
+            break
+        records.update(snapshot["records"])
+    return records
+
+
+def journal_records(path, period):
+    """
+    Doc id -> latest saved doc of `period` from the app's save journal, delivered or not.
+
+    Opening the journal compacts it, so run this while the app is stopped.
+    """
+    from save_journal import SaveJournal
+
+    if not os.path.exists(path):
+        raise SystemExit(f"No save journal at {path}")
+    journal = SaveJournal(path)
+    try:
+        saved = journal.latest_records()
+    finally:
+        journal.close()
+    prefix = f"{PERIODS_COLLECTION}/{period}/{EMPLOYEES_COLLECTION}/"
+    return {doc_path[len(prefix):]: data for doc_path, data in saved.items() if doc_path.startswith(prefix)}
+
+
+def load_into_firestore(db, period, records, workers=8, progress=None):
+    """Write flat snapshot records (or columnar docs) into a month partition as columnar docs; returns the count."""
+    from firestore_bulk import bulk_set
+    from firestore_sync import period_collection
+    from record_schema import to_columnar
+
+    docs = {employee_doc_id(code): to_columnar(record) for code, record in records.items()}
+    return bulk_set(db, period_collection(db, period), docs, workers=workers, progress=progress)
+
+
+def firestore_client(key_path):
+    """Firestore client for the service-account file, initialising the default app once."""
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    try:
+        firebase_admin.get_app()
+    except ValueError:
+        firebase_admin.initialize_app(credentials.Certificate(key_path))
+    return firestore.client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index or restore attendance backup snapshots.")
+    parser.add_argument("directory", nargs="?", default=".", help="folder holding attendance_backup*.json")
+    parser.add_argument("--period", help="target month partition, YYYY-MM (required with --load)")
+    parser.add_argument("--upto", type=int, help="restore the state as of this snapshot number")
+    parser.add_argument("--load", action="store_true", help="write the chosen state to Firestore")
+    parser.add_argument("--key", default="firebase_key.json", help="Firebase service-account file")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument("--from-journal", metavar="PATH",
+                        help="restore the latest saves from the app's save journal instead (app stopped)")
+    args = parser.parse_args()
+
+    if args.from_journal:
+        if not args.period:
+            parser.error("--period is required with --from-journal")
+        records = journal_records(args.from_journal, args.period)
+        print(f"📒 {len(records)} employees for {args.period} in {args.from_journal}")
+        if not args.load:
+            return
+    else:
+        snapshots = scan_snapshots(args.directory, workers=args.workers)
+        for snapshot in snapshots:
+            if "error" in snapshot:
+                print(f"⚠️ Skipped {snapshot['path']}: {snapshot['error']}")
+        records = records_at(snapshots, args.upto)
+        if not args.load:
+            for code, path in sorted(build_index(snapshots).items()):
+                print(f"{code}\t{os.path.basename(path)}")
+            print(f"📦 {len(snapshots)} snapshots, {len(records)} employees at "
+                  f"{'snapshot ' + str(args.upto) if args.upto is not None else 'latest'}")
+            return
+    if not args.period:
+        parser.error("--period is required with --load")
+    db = firestore_client(args.key)
+    written = load_into_firestore(db, args.period, records,
+                                  progress=lambda done, total: print(f"⬆️ {done} / {total}"))
+    print(f"✅ Restored {written} employees into attendance/{args.period}")
+
+
+if __name__ == "__main__":
+    main()
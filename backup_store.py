@@ -0,0 +1,145 @@
+# 🧬 Content-addressed backup store: each distinct employee record is kept once, snapshots are manifests
+#
+#   python backup_store.py pack . backup_store          # import every attendance_backup*.json
+#   python backup_store.py restore backup_store "attendance_backup_sample data_6407" out.json
+#   python backup_store.py stats backup_store
+import argparse
+import glob
+import hashlib
+import json
+import os
+
+from backup_restore import SNAPSHOT_GLOB, snapshot_order
+
+
+def canonical(record):
+    return json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def record_hash(record):
+    return hashlib.sha256(canonical(record).encode("utf-8")).hexdigest()
+
+
+class BackupStore:
+    """
+    objects/ab/<sha256>.json holds one record; manifests/<name>.json maps a
+    snapshot's final_data_dict keys to record hashes plus its current_index.
+
+    Writing a snapshot only stores records the store has not seen, and a
+    restore reads each distinct record once however many snapshots use it.
+    """
+
+    def __init__(self, root):
+        self._root = root
+        self._known = None  # hashes already on disk, listed on first write
+        self._cache = {}    # hash -> parsed record, for reconstruction
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "manifests"), exist_ok=True)
+
+    def _object_path(self, digest):
+        return os.path.join(self._root, "objects", digest[:2], f"{digest}.json")
+
+    def _manifest_path(self, name):
+        return os.path.join(self._root, "manifests", f"{name}.json")
+
+    def _known_hashes(self):
+        if self._known is None:
+            self._known = {os.path.basename(p)[:-5]
+                           for p in glob.glob(os.path.join(self._root, "objects", "*", "*.json"))}
+        return self._known
+
+    def put_record(self, record):
+        """Store a record if new; returns its hash."""
+        text = canonical(record)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        known = self._known_hashes()
+        if digest not in known:
+            path = self._object_path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+            known.add(digest)
+        return digest
+
+    def put_snapshot(self, name, data, order=None):
+        """Store a {"final_data_dict", "current_index"} snapshot under `name`; returns its manifest."""
+        entries = data.get("final_data_dict") or {}
+        manifest = {
+            "current_index": data.get("current_index"),
+            "order": list(order) if order is not None else None,
+            "records": {key: self.put_record(record) for key, record in entries.items()},
+        }
+        tmp = f"{self._manifest_path(name)}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._manifest_path(name))
+        return manifest
+
+    def import_file(self, path):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8") as f:
+            return name, self.put_snapshot(name, json.load(f), order=snapshot_order(path))
+
+    def manifest(self, name):
+        with open(self._manifest_path(name), encoding="utf-8") as f:
+            return json.load(f)
+
+    def snapshots(self):
+        """Snapshot names, oldest first (by the order recorded at import, then name)."""
+        names = [os.path.basename(p)[:-5] for p in glob.glob(os.path.join(self._root, "manifests", "*.json"))]
+        orders = {name: self.manifest(name).get("order") or [-1, 0] for name in names}
+        return sorted(names, key=lambda name: (orders[name], name))
+
+    def get_record(self, digest):
+        record = self._cache.get(digest)
+        if record is None:
+            with open(self._object_path(digest), encoding="utf-8") as f:
+                record = self._cache[digest] = json.load(f)
+        return record
+
+    def get_snapshot(self, name):
+        """Rebuild the original snapshot dict (records come back with sorted keys)."""
+        manifest = self.manifest(name)
+        return {
+            "final_data_dict": {key: dict(self.get_record(digest)) for key, digest in manifest["records"].items()},
+            "current_index": manifest["current_index"],
+        }
+
+    def stats(self):
+        names = self.snapshots()
+        references = sum(len(self.manifest(name)["records"]) for name in names)
+        return {"snapshots": len(names), "record_refs": references, "unique_records": len(self._known_hashes())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed store for attendance backup snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="import every attendance_backup*.json from a folder")
+    pack.add_argument("directory")
+    pack.add_argument("store")
+    restore = commands.add_parser("restore", help="rebuild one snapshot as a JSON file")
+    restore.add_argument("store")
+    restore.add_argument("name")
+    restore.add_argument("output")
+    stats = commands.add_parser("stats", help="snapshot / record counts")
+    stats.add_argument("store")
+    args = parser.parse_args()
+
+    store = BackupStore(args.store)
+    if args.command == "pack":
+        paths = sorted(glob.glob(os.path.join(args.directory, SNAPSHOT_GLOB)), key=snapshot_order)
+        for path in paths:
+            store.import_file(path)
+        print(f"✅ Packed {len(paths)} snapshots: {store.stats()}")
+    elif args.command == "restore":
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(store.get_snapshot(args.name), f, indent=2, ensure_ascii=False)
+        print(f"✅ Wrote {args.output}")
+    else:
+        print(store.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# ⏱️ Cold-start benchmark: module import cost and time to the first full run of app.py
+#
+#   python bench_startup.py            # import times (fresh interpreter per module)
+#   python bench_startup.py --app      # also time a cold AppTest run of app.py (needs secrets)
+"""Cold-start benchmark for app.py: per-module import times and eagerly loaded lazy modules."""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# What a cold start of app.py pulls in, heaviest first-party modules last
+MODULES = [
+    "streamlit",
+    "pandas",
+    "numpy",
+    "firebase_admin.firestore",
+    "gspread",
+    "xlsxwriter",
+    "openpyxl",
+    "sheets_backup",
+    "excel_export",
+    "ot_engine",
+    "record_schema",
+    "write_queue",
+    "roster_import",
+    "punch_import",
+]
+
+# Modules that must NOT be loaded by app.py's own imports (they load on first use)
+LAZY = ["gspread", "xlsxwriter", "openpyxl"]
+
+_IMPORT = """
+import sys, time
+t = time.perf_counter()
+import {name}
+print(time.perf_counter() - t)
+"""
+
+_STARTUP_SET = """
+import sys
+{imports}
+print(",".join(m for m in {lazy!r} if m in sys.modules))
+"""
+
+
+def startup_imports(path=os.path.join(HERE, "app.py")):
+    """app.py's module-level import statements, so the eager-load check follows the app as it changes."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+_APP = """
+import time
+from streamlit.testing.v1 import AppTest
+t = time.perf_counter()
+AppTest.from_file("app.py", default_timeout=120).run()
+print(time.perf_counter() - t)
+"""
+
+
+def _run(code):
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True)
+    if out.returncode != 0:
+        return None
+    lines = out.stdout.strip().splitlines()
+    return lines[-1] if lines else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per measurement")
+    parser.add_argument("--app", action="store_true", help="also time a cold AppTest run of app.py")
+    args = parser.parse_args()
+
+    print(f"{'module':28} {'import (ms)':>12}")
+    for name in MODULES:
+        samples = [_run(_IMPORT.format(name=name)) for _ in range(args.repeat)]
+        samples = [float(s) * 1000 for s in samples if s is not None]
+        print(f"{name:28} {statistics.median(samples):12.1f}" if samples else f"{name:28} {'n/a':>12}")
+
+    eager = _run(_STARTUP_SET.format(imports=startup_imports(), lazy=LAZY))
+    if eager is None:
+        print("\nstartup import set: failed (missing dependencies?)")
+    else:
+        print(f"\nloaded eagerly at startup that should be lazy: {eager or 'none'}")
+
+    if args.app:
+        samples = [_run(_APP) for _ in range(args.repeat)]
+        samples = [float(s) for s in samples if s is not None]
+        print(f"cold first run of app.py: {statistics.median(samples):.2f} s" if samples
+              else "cold first run of app.py: failed (missing secrets or dependencies?)")
+
+
+if __name__ == "__main__":
+    main()
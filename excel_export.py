@@ -0,0 +1,44 @@
+# 📥 Streaming Excel export: rows go straight into xlsxwriter's constant_memory mode
+import hashlib
+import io
+import json
+
+from record_schema import export_columns, from_columnar, read_record
+
+
+def records_digest(docs):
+    """Content hash of the records an export is built from."""
+    h = hashlib.sha256()
+    for doc in docs:
+        h.update(json.dumps(doc, sort_keys=True, default=str).encode())
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def export_rows(docs):
+    """Yield the header, then one flat row per record, without building a DataFrame."""
+    docs = [read_record(doc) for doc in docs]
+    columns = export_columns(max((doc.get("days", 0) for doc in docs), default=0))
+    yield columns
+    for doc in docs:
+        flat = from_columnar(doc)
+        yield [flat.get(column, "") for column in columns]
+
+
+def write_xlsx(docs, sheet_name="Attendance"):
+    """
+    Build the workbook row by row and return its bytes.
+
+    constant_memory flushes each row to a temp file as soon as the next one
+    starts, so memory stays flat no matter how large the roster is.
+    """
+    import xlsxwriter  # loaded only when someone actually exports
+
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    worksheet = workbook.add_worksheet(sheet_name)
+    header_format = workbook.add_format({"bold": True})
+    for row_idx, row in enumerate(export_rows(docs)):
+        worksheet.write_row(row_idx, 0, row, header_format if row_idx == 0 else None)
+    workbook.close()
+    return output.getvalue()
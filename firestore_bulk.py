@@ -0,0 +1,95 @@
+# 🧹 Bulk Firestore operations: paged queries + 500-op batches on a thread pool
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from firestore_sync import WATERMARK_FIELD
+
+BATCH_LIMIT = 500  # hard limit of ops per WriteBatch
+
+
+def _commit_deletes(db, refs):
+    batch = db.batch()
+    for ref in refs:
+        batch.delete(ref)
+    batch.commit()
+    return len(refs)
+
+
+def _commit_sets(db, collection, docs):
+    from firebase_admin import firestore
+
+    batch = db.batch()
+    for doc_id, data in docs:
+        batch.set(collection.document(doc_id), {**data, WATERMARK_FIELD: firestore.SERVER_TIMESTAMP})
+    batch.commit()
+    return len(docs)
+
+
+def _count(collection):
+    try:
+        return int(collection.count().get()[0][0].value)
+    except Exception:
+        return None  # count aggregation unavailable; progress runs without a total
+
+
+def bulk_delete(db, collection, page_size=BATCH_LIMIT, workers=8, progress=None):
+    """
+    Delete every document in `collection` and return how many were removed.
+
+    Document ids are paged by name cursor and each page is deleted as one
+    batch on a thread pool. Nothing is held between runs: a run that is
+    interrupted (or whose batches fail) leaves only undeleted documents
+    behind, so running it again simply continues with what is left.
+    `progress(deleted, total)` is called after every committed batch;
+    `total` is None when the collection size is unknown.
+    """
+    page_size = min(page_size, BATCH_LIMIT)
+    total = _count(collection) if progress else None
+    deleted = 0
+    in_flight = set()
+    cursor = None
+
+    def drain(return_when):
+        nonlocal deleted, in_flight
+        done, in_flight = wait(in_flight, return_when=return_when)
+        for future in done:
+            deleted += future.result()
+            if progress:
+                progress(deleted, total)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            query = collection.order_by("__name__").select([]).limit(page_size)
+            if cursor is not None:
+                query = query.start_after(cursor)
+            page = list(query.stream())
+            if not page:
+                break
+            cursor = page[-1]
+            in_flight.add(pool.submit(_commit_deletes, db, [doc.reference for doc in page]))
+            if len(in_flight) >= workers * 2:
+                drain(FIRST_COMPLETED)
+        while in_flight:
+            drain(FIRST_COMPLETED)
+    return deleted
+
+
+def bulk_set(db, collection, docs, workers=8, progress=None):
+    """
+    Overwrite documents in `collection` from a {doc id: data} mapping; returns how many were written.
+
+    Documents go out as 500-op batches committed on a thread pool, each
+    stamped with `updated_at` so running mirrors pick them up. Every write is
+    a full overwrite, so re-running after a failed batch is safe.
+    `progress(written, total)` is called after every committed batch.
+    """
+    items = list(docs.items())
+    total = len(items)
+    written = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_commit_sets, db, collection, items[start:start + BATCH_LIMIT])
+                   for start in range(0, total, BATCH_LIMIT)]
+        for future in futures:
+            written += future.result()
+            if progress:
+                progress(written, total)
+    return written
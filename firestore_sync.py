@@ -0,0 +1,165 @@
+# 🔄 Local mirror of a Firestore collection, refreshed by an `updated_at` watermark
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+WATERMARK_FIELD = "updated_at"
+# Records live under attendance/{YYYY-MM}/employees/{doc id}, one partition per month
+PERIODS_COLLECTION = "attendance"
+EMPLOYEES_COLLECTION = "employees"
+_FLOAT_CODE = re.compile(r"^(\d+)\.0+$")
+
+
+def period_key(year, month):
+    return f"{int(year):04d}-{int(month):02d}"
+
+
+def normalize_code(code):
+    """
+    Canonical text of an Employee Code, whatever type the file reader produced.
+
+    Spreadsheets turn a code column with a blank cell into floats, so 1001.0 /
+    "1001.0" become "1001"; blanks and NaN become "".
+    """
+    if code is None or (isinstance(code, float) and math.isnan(code)):
+        return ""
+    if isinstance(code, float) and code.is_integer():
+        return str(int(code))
+    text = str(code).strip()
+    if text.lower() in ("nan", "none"):
+        return ""
+    return _FLOAT_CODE.sub(r"\1", text)
+
+
+def employee_doc_id(code):
+    """Document id for an Employee Code; '/' is not allowed in Firestore ids."""
+    doc_id = normalize_code(code).replace("/", "_")
+    return doc_id if doc_id.strip(".") else f"code_{doc_id}"
+
+
+def period_collection(db, period):
+    """The employees subcollection holding one month's records."""
+    return db.collection(PERIODS_COLLECTION).document(period).collection(EMPLOYEES_COLLECTION)
+
+
+class RecordMirror:
+    """
+    Keeps an in-process copy of every document in a collection.
+
+    The first call streams the whole collection once. After that only documents
+    whose `updated_at` is newer than the highest value seen so far are read and
+    merged in, so a single save costs a single document read instead of N.
+    With a `RecordCache`, the first call starts from the on-disk snapshot
+    stored under `cache_key` instead of streaming the collection.
+
+    Documents written through `apply_local` win over what is read from the
+    server until a server copy stamped at or after the local write comes
+    back, so a save still queued (e.g. during an outage) never reverts to
+    the older server version on a poll or a full re-load.
+    """
+
+    def __init__(self, collection, poll_interval=5.0, cache=None, cache_key=None):
+        self._collection = collection
+        self._cache = cache
+        self._cache_key = cache_key
+        self._poll_interval = poll_interval
+        self._records = {}
+        self._local = {}  # doc id -> when it was applied locally, until the server copy catches up
+        self._watermark = None
+        self._loaded = False
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+
+    def _ingest(self, doc, changed=None):
+        data = doc.to_dict() or {}
+        updated_at = data.pop(WATERMARK_FIELD, None)
+        applied_at = self._local.get(doc.id)
+        if applied_at is None or (updated_at is not None and updated_at >= applied_at):
+            self._local.pop(doc.id, None)
+            self._records[doc.id] = data
+            if changed is not None:
+                changed[doc.id] = (data, updated_at)
+        if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+            self._watermark = updated_at
+
+    def _warm_from_cache(self):
+        cached = self._cache.load(self._cache_key) if self._cache is not None else None
+        if cached is None:
+            return False
+        self._records, self._watermark, local_ids = cached
+        # Saves that were never read back before the restart stay authoritative
+        now = datetime.now(timezone.utc)
+        self._local.update({doc_id: now for doc_id in local_ids})
+        self._loaded = True
+        return True
+
+    def _full_load(self):
+        # Start from the unconfirmed local writes rather than an empty dict
+        self._records = {doc_id: self._records[doc_id] for doc_id in self._local if doc_id in self._records}
+        self._watermark = None
+        changed = {}
+        for doc in self._collection.stream():
+            self._ingest(doc, changed)
+        self._loaded = True
+        if self._cache is not None:
+            self._cache.store(self._cache_key, self._records, self._watermark,
+                              {doc_id: version for doc_id, (_, version) in changed.items()},
+                              local_ids=self._local)
+
+    def _poll_changes(self):
+        if self._watermark is None:
+            # Nothing carries a watermark yet (legacy docs only) - fall back to a full read.
+            self._full_load()
+            return
+        query = self._collection.where(WATERMARK_FIELD, ">", self._watermark).order_by(WATERMARK_FIELD)
+        changed = {}
+        for doc in query.stream():
+            self._ingest(doc, changed)
+        if self._cache is not None and changed:
+            self._cache.update(self._cache_key, {doc_id: data for doc_id, (data, _) in changed.items()},
+                               self._watermark, {doc_id: version for doc_id, (_, version) in changed.items()})
+
+    def warm(self):
+        """Load the on-disk snapshot now (no network); the first `records()` then only polls for changes."""
+        with self._lock:
+            return self._loaded or self._warm_from_cache()
+
+    def records(self, force=False):
+        """Return a snapshot dict of doc id -> data, pulling only changed docs."""
+        with self._lock:
+            now = time.monotonic()
+            if not self._loaded:
+                if self._warm_from_cache():
+                    self._poll_changes()  # catch up on what changed while we were down
+                else:
+                    self._full_load()
+                self._last_poll = now
+            elif force or now - self._last_poll >= self._poll_interval:
+                self._poll_changes()
+                self._last_poll = now
+            return dict(self._records)
+
+    def apply_local(self, doc_id, data, replace=False):
+        """Merge (or overwrite) a write we just made so the UI sees it without a round-trip."""
+        clean = {k: v for k, v in data.items() if k != WATERMARK_FIELD}
+        with self._lock:
+            if replace:
+                self._records[doc_id] = clean
+            else:
+                self._records.setdefault(doc_id, {}).update(clean)
+            self._local[doc_id] = datetime.now(timezone.utc)
+            if self._cache is not None:
+                self._cache.put_local(self._cache_key, doc_id, self._records[doc_id])
+
+    def reset(self):
+        """Forget everything; the next `records()` call re-streams the collection."""
+        with self._lock:
+            self._records = {}
+            self._local = {}
+            self._watermark = None
+            self._loaded = False
+            self._last_poll = 0.0
+            if self._cache is not None:
+                self._cache.clear(self._cache_key)
@@ -0,0 +1,60 @@
+# 🚚 One-off migration: copy the flat `attendance_records` collection into a month partition
+#
+#   python migrate_legacy_records.py --period 2025-07            # dry run: what would be migrated
+#   python migrate_legacy_records.py --period 2025-07 --load     # write attendance/2025-07/employees
+#
+# Before the per-month partitions, every record lived in attendance_records keyed by roster
+# position; the app now only reads attendance/{YYYY-MM}/employees. The legacy collection is
+# left untouched so the migration can be re-run.
+import argparse
+
+from backup_restore import firestore_client, load_into_firestore
+from firestore_sync import normalize_code
+
+LEGACY_COLLECTION = "attendance_records"
+
+
+def legacy_records(db, collection=LEGACY_COLLECTION, period=None):
+    """
+    Employee Code -> flat record from the legacy collection.
+
+    Docs carrying a different `Period` than `period` are left out. Returns
+    (records, skipped, duplicates): docs without an Employee Code and codes
+    seen in more than one doc (the last one read wins).
+    """
+    records, skipped, duplicates = {}, 0, 0
+    for doc in db.collection(collection).stream():
+        record = doc.to_dict() or {}
+        code = normalize_code(record.get("Employee Code"))
+        if not code:
+            skipped += 1
+            continue
+        if period and record.get("Period", period) != period:
+            continue
+        duplicates += code in records
+        records[code] = {**record, "Employee Code": code}
+    return records, skipped, duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate attendance_records into a month partition.")
+    parser.add_argument("--period", required=True, help="target month partition, YYYY-MM")
+    parser.add_argument("--collection", default=LEGACY_COLLECTION, help="legacy collection to read")
+    parser.add_argument("--load", action="store_true", help="write to Firestore (default: dry run)")
+    parser.add_argument("--key", default="firebase_key.json", help="Firebase service-account file")
+    args = parser.parse_args()
+
+    db = firestore_client(args.key)
+    records, skipped, duplicates = legacy_records(db, args.collection, args.period)
+    print(f"📄 {len(records)} employees in {args.collection} for {args.period}"
+          f"{f' ({skipped} docs without an Employee Code skipped)' if skipped else ''}"
+          f"{f' ({duplicates} duplicate codes, last doc kept)' if duplicates else ''}")
+    if not args.load or not records:
+        return
+    written = load_into_firestore(db, args.period, records,
+                                  progress=lambda done, total: print(f"⬆️ {done} / {total}"))
+    print(f"✅ Migrated {written} employees into attendance/{args.period}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# 🕘 Times as integer minutes since midnight (no "HH.MM" float arithmetic)
+import re
+
+import numpy as np
+
+MINUTE_DTYPE = np.int16
+MISSING = -1  # blank or unparsable time
+MINUTES_PER_DAY = 24 * 60
+
+_HHMM = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*$")
+
+
+def parse_hhmm(text):
+    """"09:30" -> 570. Returns MISSING for anything that is not a valid H:MM / HH:MM."""
+    match = _HHMM.match(text) if isinstance(text, str) else None
+    if not match:
+        return MISSING
+    h, m = int(match.group(1)), int(match.group(2))
+    if h > 23 or m > 59:
+        return MISSING
+    return h * 60 + m
+
+
+def parse_hhmm_array(values):
+    """Vector form of `parse_hhmm`; returns an int16 array with MISSING holes."""
+    values = np.asarray(values, dtype=object).ravel()
+    out = np.full(len(values), MISSING, dtype=MINUTE_DTYPE)
+    if not len(values):
+        return out
+    text = values.astype(str)
+    width = text.dtype.itemsize // 4
+    if width >= 5:
+        # Fast path: exact "HH:MM", decoded straight from the unicode code points.
+        codes = text.view(np.uint32).reshape(len(text), width).astype(np.int32) - 48
+        digits = codes[:, [0, 1, 3, 4]]
+        ok = (codes[:, 2] == ord(":") - 48) & ((digits >= 0) & (digits <= 9)).all(axis=1)
+        if width > 5:
+            ok &= (codes[:, 5:] == -48).all(axis=1)
+        h = digits[:, 0] * 10 + digits[:, 1]
+        m = digits[:, 2] * 10 + digits[:, 3]
+        ok &= (h <= 23) & (m <= 59)
+        out[ok] = (h * 60 + m)[ok]
+    else:
+        ok = np.zeros(len(values), dtype=bool)
+    # Rare shapes ("9:30", padded input) go through the scalar parser.
+    for i in np.flatnonzero(~ok):
+        out[i] = parse_hhmm(values[i])
+    return out
+
+
+def format_hhmm(minutes):
+    """570 -> "09:30"; wraps past midnight, MISSING -> ""."""
+    if minutes < 0:
+        return ""
+    h, m = divmod(int(minutes) % MINUTES_PER_DAY, 60)
+    return f"{h:02d}:{m:02d}"
+
+
+def format_hhmm_array(minutes):
+    """Vector form of `format_hhmm`; returns an object array of strings."""
+    minutes = np.asarray(minutes)
+    table = np.array([format_hhmm(m) for m in range(MINUTES_PER_DAY)] + [""], dtype=object)
+    idx = np.where(minutes < 0, MINUTES_PER_DAY, minutes % MINUTES_PER_DAY)
+    return table[idx]
+
+
+def duration(check_in, check_out):
+    """Worked minutes between two times, wrapping overnight shifts. Scalars or arrays."""
+    ci = np.asarray(check_in, dtype=np.int32)
+    co = np.asarray(check_out, dtype=np.int32)
+    worked = np.where(co < ci, co + MINUTES_PER_DAY, co) - ci
+    return worked if worked.ndim else int(worked)
@@ -0,0 +1,97 @@
+# ⚙️ Vectorized OT / night-shift rules on integer minutes
+import numpy as np
+import pandas as pd
+
+from minute_time import MISSING, duration, format_hhmm_array, parse_hhmm_array
+
+STATUSES = ["P", "A", "L", "WO", "HL", "PH"]
+DEFAULT_CI, DEFAULT_CO = 9 * 60, 18 * 60
+# Check-out written for non-present days; everything else gets 00:00
+OFF_DAY_CHECKOUT = {"WO": 17 * 60, "HL": 13 * 60}
+
+SHIFT_MINUTES = 8 * 60
+# Leftover OT minutes: under 30 -> nothing, 30-42 -> half hour, 43+ -> full hour
+OT_HALF_FROM, OT_FULL_FROM = 30, 43
+NIGHT_CHECKIN_FROM, NIGHT_CHECKOUT_UNTIL = 20 * 60, 8 * 60
+
+
+def ot_from_minutes(worked_min):
+    """OT hours (in 0.5 steps) for worked minutes; scalars or arrays."""
+    extra = np.asarray(worked_min, dtype=np.int32) - SHIFT_MINUTES
+    whole, rest = np.divmod(np.maximum(extra, 0), 60)
+    frac = np.select([rest < OT_HALF_FROM, rest < OT_FULL_FROM], [0.0, 0.5], 1.0)
+    ot = np.where(extra <= 0, 0.0, whole + frac)
+    return ot if ot.ndim else float(ot)
+
+
+def night_shift(ci_min, co_min):
+    """Checked in from 20:00, or out by 08:00 on the same day; scalars or arrays."""
+    ci = np.asarray(ci_min)
+    co = np.asarray(co_min)
+    night = (ci >= NIGHT_CHECKIN_FROM) | ((co <= NIGHT_CHECKOUT_UNTIL) & (co >= ci))
+    return night if night.ndim else bool(night)
+
+
+def _as_minutes(values):
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        return values.ravel().astype(np.int16)
+    return parse_hhmm_array(values)
+
+
+def compute_days(status, check_in, check_out):
+    """
+    Apply the per-day rules to equally long arrays of status / check-in / check-out.
+
+    Times may be "HH:MM" strings or minutes already. Works for one employee-month
+    or a flattened roster. Returns a dict of arrays: status, ci_min, co_min (int16),
+    check_in / check_out ("HH:MM"), ot, night (bool), worked_min and invalid (bool,
+    a present day whose times could not be parsed and were reset to 09:00-18:00
+    with no OT, as the per-day form does).
+    """
+    status = np.asarray(status, dtype=object).astype("U2")
+    present = status == "P"
+    ci = _as_minutes(check_in)
+    co = _as_minutes(check_out)
+
+    invalid = present & ((ci == MISSING) | (co == MISSING))
+    off_co = np.select([status == code for code in OFF_DAY_CHECKOUT], list(OFF_DAY_CHECKOUT.values()), 0)
+    ci = np.where(present, np.where(invalid, DEFAULT_CI, ci), 0).astype(np.int16)
+    co = np.where(present, np.where(invalid, DEFAULT_CO, co), off_co).astype(np.int16)
+
+    worked = np.where(present, duration(ci, co), 0)
+    return {
+        "status": status,
+        "ci_min": ci,
+        "co_min": co,
+        "check_in": format_hhmm_array(ci),
+        "check_out": format_hhmm_array(co),
+        "ot": np.where(present & ~invalid, ot_from_minutes(worked), 0.0),
+        "night": present & ~invalid & night_shift(ci, co),
+        "worked_min": worked.astype(np.int32),
+        "invalid": invalid,
+    }
+
+
+def month_totals(computed):
+    """Status counts, OT, night and worked totals along the last (day) axis."""
+    status = computed["status"]
+    totals = {f"Total {code}": (status == code).sum(axis=-1) for code in STATUSES}
+    totals["OT Hours"] = np.round(computed["ot"].sum(axis=-1), 1)
+    totals["Night Shifts"] = computed["night"].sum(axis=-1)
+    totals["Worked Minutes"] = computed["worked_min"].sum(axis=-1)
+    return totals
+
+
+def compute_roster(status, check_in, check_out):
+    """
+    Whole roster-month in one pass: 2-D arrays shaped (employees, days).
+
+    Returns the `compute_days` arrays reshaped to the input shape plus
+    `totals`, a DataFrame with one row of `month_totals` per employee.
+    """
+    status = np.asarray(status, dtype=object)
+    flat = compute_days(status.ravel(), np.ravel(check_in), np.ravel(check_out))
+    computed = {k: v.reshape(status.shape) for k, v in flat.items()}
+    computed["totals"] = pd.DataFrame(month_totals(computed))
+    return computed
@@ -0,0 +1,174 @@
+# ⏱️ Punch-log import: pair raw in/out punches into per-day check-in / check-out for a whole roster
+import io
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from firestore_sync import normalize_code
+from minute_time import MISSING, MINUTES_PER_DAY, format_hhmm_array
+from ot_engine import NIGHT_CHECKIN_FROM, NIGHT_CHECKOUT_UNTIL
+from record_schema import day_fields
+
+CODE_COLUMN = "Employee Code"
+# Either one timestamp column, or separate Date + Time columns (typical biometric exports)
+TIMESTAMP_COLUMNS = ["Timestamp", "Punch Time", "DateTime", "Date Time"]
+DATE_COLUMN, TIME_COLUMN = "Date", "Time"
+PUNCH_TYPES = ["csv", "xlsx", "parquet", "txt"]
+
+DOUBLE_TAP_MINUTES = 2        # repeated punches closer than this count once
+MAX_SHIFT_MINUTES = 16 * 60   # an out-punch further than this from the in-punch starts a new shift
+_UTC_OFFSET = re.compile(r"(?<=:\d\d)(\.\d+)?\s*(?:Z|UTC|GMT|[+-]\d\d:?\d\d)$", re.IGNORECASE)
+
+
+def _read_table(data, filename):
+    extension = os.path.splitext(filename)[1].lower().lstrip(".")
+    buffer = io.BytesIO(data)
+    if extension in ("csv", "txt"):
+        # Device logs are often tab or semicolon separated; sniff the header, parse with the C engine
+        header = data[:data.find(b"\n")] if b"\n" in data else data
+        sep = max([",", ";", "\t", "|"], key=lambda d: header.count(d.encode()))
+        return pd.read_csv(buffer, sep=sep, dtype=str)
+    if extension == "parquet":
+        return pd.read_parquet(buffer)
+    return pd.read_excel(buffer, dtype=str)
+
+
+def _parse_timestamps(text):
+    # A UTC offset (2026-03-01T09:00:00+05:30) would make the parse tz-aware; the device's wall-clock
+    # time is what attendance counts, so the offset is dropped before parsing (regex only on candidates).
+    offset = text.str[-6:].str.contains(r"[+-]|[A-Za-z]$")
+    if offset.any():
+        text = text.copy()
+        text[offset] = text[offset].str.replace(_UTC_OFFSET, r"\1", regex=True)
+    # Year-first (ISO) stamps must not be read day-first, or 2026-03-01 becomes 3 January, and a
+    # log can mix both, so each group gets its own inferred format (vectorised); only rows that
+    # format rejects go through the slow mixed parser, with the same dayfirst as their group.
+    ts = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    iso = text.str.match(r"\d{4}[-/]")
+    for rows, dayfirst in ((iso, False), (~iso, True)):
+        if not rows.any():
+            continue
+        part = pd.to_datetime(text[rows], dayfirst=dayfirst, errors="coerce")
+        missed = part.isna() & text[rows].ne("") & text[rows].ne("nan")
+        if missed.any():
+            part[missed] = pd.to_datetime(text[rows][missed], dayfirst=dayfirst, errors="coerce", format="mixed")
+        ts[rows] = part
+    return ts
+
+
+def read_punches(data, filename):
+    """
+    Punch log -> DataFrame of `code` (str) and `ts` (datetime64), sorted.
+
+    Rows whose timestamp cannot be parsed are dropped; their count is in
+    `df.attrs["skipped"]`. Dates are read day-first (dd-mm-yyyy) unless they
+    start with the year; a UTC offset is dropped, keeping the wall-clock time.
+    Raises ValueError when the code or time columns are missing.
+    """
+    df = _read_table(data, filename)
+    df.columns = [str(col).strip() for col in df.columns]
+    if CODE_COLUMN not in df.columns:
+        raise ValueError(f"Punch log must include '{CODE_COLUMN}'")
+    stamp = next((col for col in TIMESTAMP_COLUMNS if col in df.columns), None)
+    if stamp is not None:
+        text = df[stamp].astype(str)
+    elif DATE_COLUMN in df.columns and TIME_COLUMN in df.columns:
+        text = df[DATE_COLUMN].astype(str) + " " + df[TIME_COLUMN].astype(str)
+    else:
+        raise ValueError(f"Punch log must include one of {', '.join(TIMESTAMP_COLUMNS)} "
+                         f"or '{DATE_COLUMN}' + '{TIME_COLUMN}'")
+    punches = pd.DataFrame({
+        "code": df[CODE_COLUMN].map(normalize_code),
+        "ts": _parse_timestamps(text.str.strip()),
+    })
+    valid = punches["ts"].notna() & (punches["code"] != "")
+    punches = punches[valid].sort_values(["code", "ts"], kind="stable").reset_index(drop=True)
+    punches.attrs["skipped"] = int((~valid).sum())
+    return punches
+
+
+def pair_punches(punches, year, month):
+    """
+    Pair each employee's punches into shifts and keep the shifts starting in `year`/`month`.
+
+    Punches are taken in time order: the first is an in-punch, the next one
+    within MAX_SHIFT_MINUTES is its out-punch (possibly after midnight, for
+    night shifts); a punch with nothing after it in that window is an
+    unmatched in-punch. An employee's first punch is dropped as the tail of
+    a night shift from before the log when it is before 08:00 and the next
+    punch is a night check-in (from 20:00). A shift belongs to the day it started on; with
+    several shifts in a day the first in and the last out are kept.
+    Returns a DataFrame of code, day (1-based), ci_min, co_min (MISSING when
+    the out-punch is absent).
+    """
+    codes = punches["code"].to_numpy()
+    minutes = punches["ts"].to_numpy().astype("datetime64[m]").astype(np.int64)
+    keep = np.ones(len(codes), dtype=bool)
+    same = codes[1:] == codes[:-1]
+    keep[1:] = ~same | (np.diff(minutes) >= DOUBLE_TAP_MINUTES)
+    codes, minutes = codes[keep], minutes[keep]
+
+    starts, ends, owners = [], [], []
+    i, n = 0, len(codes)
+    while i < n:
+        first = i == 0 or codes[i - 1] != codes[i]
+        if (first and minutes[i] % MINUTES_PER_DAY < NIGHT_CHECKOUT_UNTIL and i + 1 < n
+                and codes[i + 1] == codes[i] and minutes[i + 1] % MINUTES_PER_DAY >= NIGHT_CHECKIN_FROM):
+            i += 1  # orphan out-punch of a shift that started before the log
+            continue
+        owners.append(codes[i])
+        starts.append(minutes[i])
+        if i + 1 < n and codes[i + 1] == codes[i] and minutes[i + 1] - minutes[i] <= MAX_SHIFT_MINUTES:
+            ends.append(minutes[i + 1])
+            i += 2
+        else:
+            ends.append(-1)
+            i += 1
+
+    shifts = pd.DataFrame({"code": owners, "start": starts, "end": ends})
+    start_ts = pd.to_datetime(shifts["start"], unit="m")
+    shifts = shifts[(start_ts.dt.year == year) & (start_ts.dt.month == month)]
+    start_ts = start_ts[shifts.index]
+    shifts = shifts.assign(
+        day=start_ts.dt.day.to_numpy(),
+        ci_min=(shifts["start"] % MINUTES_PER_DAY).astype(np.int16),
+        co_min=np.where(shifts["end"] >= 0, shifts["end"] % MINUTES_PER_DAY, MISSING).astype(np.int16),
+    )
+    # First in of the day, and the out of the day's last shift
+    shifts = shifts.sort_values(["code", "day", "start"], kind="stable")
+    grouped = shifts.groupby(["code", "day"], sort=False)
+    return pd.DataFrame({
+        "ci_min": grouped["ci_min"].first(),
+        "co_min": grouped["co_min"].last(),
+    }).reset_index()
+
+
+def roster_days(pairs, codes, records, days):
+    """
+    (employees, days) Status / Check-in / Check-out string arrays for `compute_roster`.
+
+    Days with a shift become "P" with the punched times; other days keep
+    what is stored in `records` (one stored document or None per roster
+    code) or are marked "A" for employees without a record. Also returns the
+    boolean `punched` matrix.
+    """
+    row = {normalize_code(code): i for i, code in enumerate(codes)}
+    status = np.full((len(codes), days), "A", dtype=object)
+    check_in = np.full((len(codes), days), "00:00", dtype=object)
+    check_out = np.full((len(codes), days), "00:00", dtype=object)
+    for i, record in enumerate(records):
+        if record:
+            fields = day_fields(record, days)
+            status[i], check_in[i], check_out[i] = fields["Status"], fields["Check-in"], fields["Check-out"]
+
+    pairs = pairs[pairs["code"].isin(row.keys()) & (pairs["day"] <= days)]
+    r = pairs["code"].map(row).to_numpy()
+    c = pairs["day"].to_numpy() - 1
+    punched = np.zeros((len(codes), days), dtype=bool)
+    punched[r, c] = True
+    status[r, c] = "P"
+    check_in[r, c] = format_hhmm_array(pairs["ci_min"].to_numpy())
+    check_out[r, c] = format_hhmm_array(pairs["co_min"].to_numpy())
+    return status, check_in, check_out, punched
@@ -0,0 +1,107 @@
+# 💾 On-disk cache of attendance records so a restarted process serves data without a full stream
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+LOCAL_VERSION = "local"  # updated_at of a row written by put_local and not read back from the server yet
+
+
+class RecordCache:
+    """
+    SQLite copy of each month's records plus the `updated_at` watermark they
+    were read at.
+
+    A `RecordMirror` warms itself from here on its first call and then only
+    asks Firestore for documents changed since the stored watermark. Local
+    saves are written through per document (with no server version yet) and
+    replaced once the saved document is read back. A period snapshot older
+    than `ttl` seconds is discarded so deletions made elsewhere are picked up.
+    """
+
+    def __init__(self, path, ttl=24 * 3600):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " period TEXT, doc_id TEXT, data TEXT, updated_at TEXT,"
+                " PRIMARY KEY (period, doc_id))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS periods (period TEXT PRIMARY KEY, watermark TEXT, loaded_at REAL)"
+            )
+
+    def load(self, period):
+        """
+        (records, watermark, local ids) for `period`, or None when there is no
+        fresh snapshot. Local ids are documents written through `put_local`
+        that no server read has replaced yet.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT watermark, loaded_at FROM periods WHERE period = ?", (period,)
+            ).fetchone()
+            if row is None or time.time() - row[1] > self._ttl:
+                return None
+            records, local_ids = {}, []
+            for doc_id, data, version in self._conn.execute(
+                "SELECT doc_id, data, updated_at FROM records WHERE period = ?", (period,)
+            ):
+                records[doc_id] = json.loads(data)
+                if version == LOCAL_VERSION:
+                    local_ids.append(doc_id)
+        watermark = datetime.fromisoformat(row[0]) if row[0] else None
+        return records, watermark, local_ids
+
+    def store(self, period, records, watermark, versions=None, local_ids=()):
+        """Replace the whole snapshot of `period` (after a full stream); `local_ids` stay marked local."""
+        versions = {**(versions or {}), **{doc_id: LOCAL_VERSION for doc_id in local_ids}}
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM records WHERE period = ?", (period,))
+            self._conn.executemany(
+                "INSERT INTO records VALUES (?, ?, ?, ?)",
+                [(period, doc_id, json.dumps(data, default=str), _iso(versions.get(doc_id)))
+                 for doc_id, data in records.items()],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO periods VALUES (?, ?, ?)", (period, _iso(watermark), time.time())
+            )
+
+    def update(self, period, records, watermark, versions=None):
+        """Upsert the documents read by a watermark poll and advance the watermark."""
+        versions = versions or {}
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)",
+                [(period, doc_id, json.dumps(data, default=str), _iso(versions.get(doc_id)))
+                 for doc_id, data in records.items()],
+            )
+            self._conn.execute(
+                "UPDATE periods SET watermark = ? WHERE period = ?", (_iso(watermark), period)
+            )
+
+    def put_local(self, period, doc_id, data):
+        """Write through a local save; it has no server version until it is read back."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)",
+                (period, doc_id, json.dumps(data, default=str), LOCAL_VERSION),
+            )
+
+    def clear(self, period):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM records WHERE period = ?", (period,))
+            self._conn.execute("DELETE FROM periods WHERE period = ?", (period,))
+
+    def periods(self):
+        """Periods with a snapshot, most recently loaded first."""
+        with self._lock:
+            return [p for (p,) in self._conn.execute("SELECT period FROM periods ORDER BY loaded_at DESC")]
+
+
+def _iso(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
@@ -0,0 +1,163 @@
+# 🗃️ Columnar attendance documents: one array per field instead of ~155 "NN_Field" keys
+import numpy as np
+import pandas as pd
+
+from minute_time import MISSING, format_hhmm_array, parse_hhmm
+
+SCHEMA_VERSION = 2
+# One character per day in the packed `status` string
+STATUS_CODES = {"P": "P", "A": "A", "L": "L", "WO": "W", "HL": "H", "PH": "X"}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+IDENTITY_FIELDS = ["Employee Code", "Employee Name"]
+TOTAL_FIELDS = ["OT Hours", "Total A", "Total HL", "Total L", "Total P", "Total PH", "Total WO"]
+DAY_FIELDS = ["Check-in", "Check-out", "Night", "OT", "Status"]  # sorted, as in the flat layout
+DAY_DEFAULTS = {"Status": "P", "Check-in": "09:00", "Check-out": "18:00"}
+EXTRA_FIELD = "extra"  # flat fields with no columnar slot, kept verbatim
+
+
+def is_columnar(doc):
+    return isinstance(doc, dict) and doc.get("schema") == SCHEMA_VERSION
+
+
+def _flat_days(flat):
+    days = [int(k[:2]) for k in flat if len(k) > 3 and k[:2].isdigit() and k[2] == "_"]
+    return max(days, default=0)
+
+
+def layout_fields(flat):
+    """Only the identity, total and `NN_Field` day keys of a flat record (the fixed backup row layout)."""
+    return {key: value for key, value in flat.items() if key in _LAYOUT_KEYS or _is_day_key(key)}
+
+
+_LAYOUT_KEYS = set(IDENTITY_FIELDS + TOTAL_FIELDS)
+
+
+def _is_day_key(key):
+    return len(key) > 3 and key[:2].isdigit() and key[3:] in DAY_FIELDS and key[2] == "_"
+
+
+def to_columnar(flat):
+    """
+    Pack a flat `NN_Field` record into the columnar document layout.
+
+    Fields without a columnar slot (e.g. a legacy "Total Attendance"), and
+    times or statuses that cannot be packed, are kept verbatim under
+    `extra` so `from_columnar` gives them back instead of defaults.
+    """
+    if is_columnar(flat):
+        return dict(flat)
+    days = _flat_days(flat)
+    keys = [f"{day:02d}" for day in range(1, days + 1)]
+    extra = {key: value for key, value in flat.items()
+             if key not in _LAYOUT_KEYS and not (_is_day_key(key) and int(key[:2]) <= days)}
+    status = [flat.get(f"{d}_Status", DAY_DEFAULTS["Status"]) for d in keys]
+    night_bits = 0
+    for i, d in enumerate(keys):
+        if flat.get(f"{d}_Night") == "Yes":
+            night_bits |= 1 << i
+        if status[i] not in STATUS_CODES:
+            extra[f"{d}_Status"] = status[i]
+    times = {}
+    for field in ("Check-in", "Check-out"):
+        texts = [flat.get(f"{d}_{field}", "") for d in keys]
+        times[field] = [parse_hhmm(text) for text in texts]
+        extra.update({f"{d}_{field}": text for d, text, minutes in zip(keys, texts, times[field])
+                      if minutes == MISSING and text not in ("", None)})
+    doc = {field: flat[field] for field in IDENTITY_FIELDS + TOTAL_FIELDS if field in flat}
+    doc.update({
+        "schema": SCHEMA_VERSION,
+        "days": days,
+        "status": "".join(STATUS_CODES.get(s, "P") for s in status),
+        "ci_min": times["Check-in"],
+        "co_min": times["Check-out"],
+        "ot": [float(flat.get(f"{d}_OT", 0) or 0) for d in keys],
+        "night": night_bits,
+    })
+    if extra:
+        doc[EXTRA_FIELD] = extra
+    return doc
+
+
+def from_columnar(doc):
+    """Expand a columnar document back to the flat layout (Sheets backup, old readers)."""
+    if not is_columnar(doc):
+        return dict(doc)
+    flat = {field: doc[field] for field in IDENTITY_FIELDS + TOTAL_FIELDS if field in doc}
+    fields = day_fields(doc, doc["days"])
+    for i in range(doc["days"]):
+        d = f"{i + 1:02d}"
+        for field in DAY_FIELDS:
+            flat[f"{d}_{field}"] = fields[field][i]
+    flat.update(doc.get(EXTRA_FIELD, {}))
+    return flat
+
+
+def read_record(doc):
+    """Compatibility reader: always returns the columnar layout."""
+    return to_columnar(doc or {})
+
+
+def day_fields(doc, days):
+    """Per-day lists (Check-in, Check-out, Night, OT, Status) for either layout, padded to `days`."""
+    if not is_columnar(doc):
+        doc = read_record(doc)
+    stored = min(doc.get("days", 0), days)
+    status = [STATUS_NAMES.get(c, "P") for c in doc.get("status", "")[:stored]]
+    ci = np.array(doc.get("ci_min", [])[:stored], dtype=np.int16)
+    co = np.array(doc.get("co_min", [])[:stored], dtype=np.int16)
+    pad = days - stored
+    check_in = list(format_hhmm_array(ci)) + [DAY_DEFAULTS["Check-in"]] * pad
+    check_out = list(format_hhmm_array(co)) + [DAY_DEFAULTS["Check-out"]] * pad
+    night = doc.get("night", 0)
+    return {
+        "Check-in": [v or DAY_DEFAULTS["Check-in"] for v in check_in],
+        "Check-out": [v or DAY_DEFAULTS["Check-out"] for v in check_out],
+        "Night": ["Yes" if night >> i & 1 else "No" for i in range(days)],
+        "OT": list(doc.get("ot", [])[:stored]) + [0.0] * pad,
+        "Status": status + [DAY_DEFAULTS["Status"]] * pad,
+    }
+
+
+def export_columns(days):
+    """Column order of the flat export for a month of `days` days."""
+    return IDENTITY_FIELDS + TOTAL_FIELDS + [f"{day:02d}_{field}" for day in range(1, days + 1)
+                                            for field in DAY_FIELDS]
+
+
+def records_frame(docs):
+    """
+    Build the export DataFrame straight from columnar arrays.
+
+    Columns come out in the flat export order (identity, totals, then
+    NN_Check-in ... NN_Status per day) without sorting any key strings.
+    """
+    docs = [read_record(doc) for doc in docs]
+    days = max((doc.get("days", 0) for doc in docs), default=0)
+    columns = {field: [doc.get(field, "") for doc in docs] for field in IDENTITY_FIELDS + TOTAL_FIELDS}
+    if not docs:
+        return pd.DataFrame(columns=list(columns))
+    n = len(docs)
+    status = np.full((n, days), "", dtype=object)
+    ci = np.full((n, days), MISSING, dtype=np.int16)
+    co = np.full((n, days), MISSING, dtype=np.int16)
+    ot = np.full((n, days), np.nan)
+    night = np.zeros((n, days), dtype=bool)
+    for row, doc in enumerate(docs):
+        k = doc.get("days", 0)
+        status[row, :k] = [STATUS_NAMES.get(c, "") for c in doc.get("status", "")[:k]]
+        ci[row, :k] = doc.get("ci_min", [])[:k]
+        co[row, :k] = doc.get("co_min", [])[:k]
+        ot[row, :k] = doc.get("ot", [])[:k]
+        night[row, :k] = [(doc.get("night", 0) >> i) & 1 for i in range(k)]
+    has_day = status != ""
+    check_in = format_hhmm_array(ci)
+    check_out = format_hhmm_array(co)
+    night_text = np.where(has_day, np.where(night, "Yes", "No"), "")
+    for i in range(days):
+        d = f"{i + 1:02d}"
+        columns[f"{d}_Check-in"] = check_in[:, i]
+        columns[f"{d}_Check-out"] = check_out[:, i]
+        columns[f"{d}_Night"] = night_text[:, i]
+        columns[f"{d}_OT"] = ot[:, i]
+        columns[f"{d}_Status"] = status[:, i]
+    return pd.DataFrame(columns)
@@ -1,15 +1,180 @@
+# 🛟 Recovery export: page a Firestore collection in parallel partitions into JSONL / Parquet / xlsx
+#
+#   python recover_firestore_data.py                                   # attendance_records -> recovered_attendance.jsonl
+#   python recover_firestore_data.py --period 2025-07 -o recovered_attendance.xlsx
+#   python recover_firestore_data.py --partitions 16 -o dump.parquet    # re-run the same command to resume
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from google.cloud import firestore
 
 cred_path = "firebase_key.json"
-db = firestore.Client.from_service_account_json(cred_path)
+PAGE_SIZE = 500
+
+
+def _collection(db, args):
+    if args.period:
+        return db.collection("attendance").document(args.period).collection("employees")
+    return db.collection(args.collection)
+
+
+def _path(collection):
+    return "/".join(collection._path)
+
+
+def _partition_bounds(db, collection, count):
+    """
+    [(start path | None, end path | None)] ranges cut at `get_partitions` split points.
+
+    Partitioning works on collection groups, which also span same-named
+    collections elsewhere (other months' `employees`); only split points
+    inside this collection are kept.
+    """
+    if count <= 1:
+        return [(None, None)]
+    prefix = _path(collection) + "/"
+    try:
+        partitions = list(db.collection_group(collection.id).get_partitions(count))
+    except Exception:
+        return [(None, None)]  # partitioning unavailable (emulator, permissions): one sequential reader
+    cuts = sorted({p.end_at.path for p in partitions
+                   if p.end_at is not None and p.end_at.path.startswith(prefix)})
+    return list(zip([None] + cuts, cuts + [None]))
+
+
+class Checkpoint:
+    """Per-partition progress (last exported doc path, done flag), rewritten atomically after every page."""
+
+    def __init__(self, path):
+        self._path = path
+        self._lock = threading.Lock()
+        self.state = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def save(self):
+        with self._lock:
+            with open(f"{self._path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(self.state, f)
+            os.replace(f"{self._path}.tmp", self._path)
+
+    def update(self, part, **fields):
+        with self._lock:
+            self.state["parts"][part].update(fields)
+        self.save()
+
+
+def _export_partition(db, collection, part, bounds, checkpoint, part_path, page_size):
+    """Page one partition by document-name cursor, appending JSON lines to its own part file."""
+    start, end = bounds
+    progress = checkpoint.state["parts"][part]
+    last = progress.get("last")
+    with open(part_path, "a", encoding="utf-8") as out:
+        # Drop lines written after the last checkpoint (crash between write and checkpoint)
+        out.truncate(progress.get("bytes", 0))
+        while True:
+            query = collection.order_by("__name__").limit(page_size)
+            if last:
+                query = query.start_after({"__name__": db.document(last)})
+            elif start:
+                query = query.start_at({"__name__": db.document(start)})
+            if end:
+                query = query.end_before({"__name__": db.document(end)})
+            page = list(query.stream())
+            for doc in page:
+                out.write(json.dumps({"path": doc.reference.path, "id": doc.id, "data": doc.to_dict()},
+                                     default=str, ensure_ascii=False) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            if page:
+                last = page[-1].reference.path
+                checkpoint.update(part, last=last, bytes=out.tell(),
+                                  count=progress.get("count", 0) + len(page))
+            if len(page) < page_size:
+                checkpoint.update(part, done=True)
+                return progress.get("count", 0)
+
+
+def _read_parts(part_paths):
+    for path in part_paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def _write_output(output, part_paths):
+    extension = os.path.splitext(output)[1].lower()
+    if extension == ".jsonl":
+        with open(output, "w", encoding="utf-8") as out:
+            for path in part_paths:
+                with open(path, encoding="utf-8") as f:
+                    out.write(f.read())
+        return
+    from record_schema import records_frame
+
+    docs = [row["data"] for row in _read_parts(part_paths)]
+    if extension == ".parquet":
+        frame = records_frame(docs)
+        frame.insert(0, "doc_id", [row["id"] for row in _read_parts(part_paths)])
+        frame.to_parquet(output, index=False)
+    elif extension == ".xlsx":
+        from excel_export import write_xlsx
+
+        with open(output, "wb") as f:
+            f.write(write_xlsx(docs))
+    else:
+        raise SystemExit(f"Unsupported output type {extension}: use .jsonl, .parquet or .xlsx")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a Firestore attendance collection for recovery.")
+    parser.add_argument("--collection", default="attendance_records", help="top-level collection to export")
+    parser.add_argument("--period", help="export attendance/{YYYY-MM}/employees instead")
+    parser.add_argument("-o", "--output", default="recovered_attendance.jsonl",
+                        help="output file: .jsonl, .parquet or .xlsx")
+    parser.add_argument("--partitions", type=int, default=8, help="parallel readers (get_partitions)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--key", default=cred_path, help="service-account file")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    db = firestore.Client.from_service_account_json(args.key)
+    collection = _collection(db, args)
+    checkpoint = Checkpoint(f"{args.output}.checkpoint.json")
+    if args.restart or checkpoint.state.get("collection") != _path(collection):
+        # Partition points are fixed in the checkpoint, so a resumed run reads the same ranges
+        bounds = _partition_bounds(db, collection, args.partitions)
+        checkpoint.state = {"collection": _path(collection),
+                            "parts": [{"start": s, "end": e} for s, e in bounds]}
+        for part in range(len(bounds)):
+            if os.path.exists(f"{args.output}.part{part:03d}.jsonl"):
+                os.remove(f"{args.output}.part{part:03d}.jsonl")
+        checkpoint.save()
+    parts = checkpoint.state["parts"]
+    part_paths = [f"{args.output}.part{part:03d}.jsonl" for part in range(len(parts))]
+
+    pending = [part for part, progress in enumerate(parts) if not progress.get("done")]
+    print(f"📥 {len(parts)} partitions, {len(parts) - len(pending)} already exported")
+    with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+        futures = [pool.submit(_export_partition, db, collection, part, (parts[part]["start"], parts[part]["end"]),
+                               checkpoint, part_paths[part], args.page_size) for part in pending]
+        for future in futures:
+            future.result()
 
-collection = db.collection("attendance_records")
-docs = collection.stream()
+    total = sum(progress.get("count", 0) for progress in parts)
+    if total:
+        _write_output(args.output, part_paths)
+    for path in part_paths + [f"{args.output}.checkpoint.json"]:
+        os.remove(path)
+    if total:
+        print(f"✅ Exported {total} documents to {args.output}")
+    else:
+        print(f"⚠️ No data found in {_path(collection)}.")
 
-found = False
-for doc in docs:
-    print(f"{doc.id} => {doc.to_dict()}")
-    found = True
 
-if not found:
-    print("⚠️ No data found in attendance_records collection.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# 👥 Roster ingestion: read only the two roster columns from xlsx / csv / parquet uploads
+import hashlib
+import io
+import os
+
+import pandas as pd
+
+from firestore_sync import normalize_code
+
+ROSTER_COLUMNS = ["Employee Code", "Employee Name"]
+ROSTER_TYPES = ["xlsx", "csv", "parquet"]
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _wanted(column):
+    return str(column).strip() in ROSTER_COLUMNS
+
+
+def _read_xlsx(buffer):
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return _read_xlsx_openpyxl(buffer)
+    # calamine (Rust) parses xlsx several times faster than openpyxl
+    return pd.read_excel(buffer, usecols=_wanted, engine="calamine", dtype=str)
+
+
+def _read_xlsx_openpyxl(buffer):
+    """Read-only openpyxl, iterating just the column span the roster fields sit in."""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(buffer, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+        positions = [i for i, column in enumerate(header) if _wanted(column)]
+        if not positions:
+            return pd.DataFrame(columns=[str(c) for c in header if c is not None])
+        first, last = min(positions), max(positions)
+        rows = sheet.iter_rows(min_row=2, min_col=first + 1, max_col=last + 1, values_only=True)
+        df = pd.DataFrame.from_records(list(rows), columns=list(header[first:last + 1]))
+    finally:
+        workbook.close()
+    return df.dropna(how="all")
+
+
+def _read_parquet(buffer):
+    try:
+        df = pd.read_parquet(buffer, columns=ROSTER_COLUMNS)
+    except Exception:
+        # Column names with stray whitespace: read everything and pick below
+        buffer.seek(0)
+        df = pd.read_parquet(buffer)
+    # Same text codes as the csv / xlsx readers (and the punch log reader)
+    codes = [column for column in df.columns if str(column).strip() == "Employee Code"]
+    return df.astype({column: str for column in codes})
+
+
+def read_roster(data, filename):
+    """
+    Parse an uploaded roster into an Employee Code / Employee Name frame.
+
+    Only the two roster columns are read (other HR columns are skipped by the
+    parser, not loaded and dropped), headers are whitespace-stripped and
+    identical rows are dropped. Codes are read as text, so leading zeros are
+    kept, and normalised with `normalize_code`; rows without a code are
+    dropped and counted in `df.attrs["blank_codes"]`.
+    Raises ValueError when a column is missing.
+    """
+    extension = os.path.splitext(filename)[1].lower().lstrip(".")
+    buffer = io.BytesIO(data)
+    if extension == "csv":
+        # Codes stay text, so 00123 keeps its zeros as in the punch log reader
+        df = pd.read_csv(buffer, usecols=_wanted, dtype=str)
+    elif extension == "parquet":
+        df = _read_parquet(buffer)
+    else:
+        df = _read_xlsx(buffer)
+    df.columns = [str(col).strip() for col in df.columns]
+    if any(col not in df.columns for col in ROSTER_COLUMNS):
+        raise ValueError("File must include 'Employee Code' and 'Employee Name'")
+    df = df[ROSTER_COLUMNS].assign(**{"Employee Code": df["Employee Code"].map(normalize_code)})
+    blank = df["Employee Code"] == ""
+    df = df[~blank].drop_duplicates().reset_index(drop=True)
+    df.attrs["blank_codes"] = int(blank.sum())
+    return df
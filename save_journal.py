@@ -0,0 +1,131 @@
+# 📒 Local write-ahead journal: every save lands on disk before it goes to the network
+import json
+import os
+import threading
+import time
+
+DESTINATIONS = ("firestore", "sheets")
+
+
+class SaveJournal:
+    """
+    Append-only JSON-lines log of saves and their acknowledgements.
+
+    `append()` writes the save and hands it to the OS; `sync()` fsyncs
+    everything written since the last call, so one fsync covers a whole
+    batch of saves. Destinations report delivery with `ack()`. On start-up
+    the file is compacted to the latest entry per document, and entries
+    that some destination never acknowledged are returned by `pending()`
+    for replay. The compacted file doubles as a local copy of the latest
+    saved version of every document (`latest_records()`, restored with
+    `backup_restore.py --from-journal`).
+    """
+
+    def __init__(self, path, compact_every=5000):
+        self._path = path
+        self._compact_every = compact_every
+        self._lock = threading.Lock()
+        self._entries = {}  # doc path -> latest entry (its "dests" = destinations still owed)
+        self._by_seq = {}   # seq -> doc path of that doc's latest entry
+        self._seq = 0
+        self._lines = 0
+        self._dirty = False
+        self._load()
+        self._compact()
+
+    def _load(self):
+        if not os.path.exists(self._path):
+            return
+        with open(self._path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break  # torn write at the tail from a crash; everything before it is intact
+                if "ack" in rec:
+                    path = self._by_seq.get(rec["ack"])
+                    if path is not None and rec.get("dest") in self._entries[path]["dests"]:
+                        self._entries[path]["dests"].remove(rec["dest"])
+                    continue
+                self._seq = max(self._seq, rec["seq"])
+                previous = self._entries.get(rec["path"])
+                if previous is not None:
+                    self._by_seq.pop(previous["seq"], None)
+                self._entries[rec["path"]] = rec
+                self._by_seq[rec["seq"]] = rec["path"]
+
+    def _compact(self):
+        tmp = f"{self._path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for rec in sorted(self._entries.values(), key=lambda r: r["seq"]):
+                f.write(json.dumps(rec) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path)
+        self._file = open(self._path, "a", encoding="utf-8")
+        self._lines = len(self._entries)
+        self._dirty = False
+
+    def _write(self, rec):
+        self._file.write(json.dumps(rec) + "\n")
+        self._file.flush()
+        self._lines += 1
+        self._dirty = True
+
+    def append(self, path, data, sheet_row=None, replace=False):
+        """Record a save; returns its sequence number."""
+        with self._lock:
+            previous = self._entries.get(path)
+            if not replace and previous is not None and "firestore" in previous["dests"]:
+                # Undelivered merge-writes fold together so compaction cannot drop one
+                data = {**previous["data"], **data}
+                replace = previous["replace"]
+            self._seq += 1
+            rec = {
+                "seq": self._seq,
+                "path": path,
+                "data": data,
+                "sheet_row": sheet_row,
+                "replace": replace,
+                "dests": [d for d in DESTINATIONS if d != "sheets" or sheet_row is not None],
+                "at": time.time(),
+            }
+            if previous is not None:
+                self._by_seq.pop(previous["seq"], None)
+            self._entries[path] = rec
+            self._by_seq[rec["seq"]] = path
+            self._write(rec)
+            return rec["seq"]
+
+    def sync(self):
+        """fsync everything appended since the last call (one fsync per batch)."""
+        with self._lock:
+            if self._dirty:
+                os.fsync(self._file.fileno())
+                self._dirty = False
+
+    def ack(self, dest, seqs):
+        """Mark entries as delivered to `dest` ("firestore" or "sheets")."""
+        with self._lock:
+            for seq in seqs:
+                self._write({"ack": seq, "dest": dest})
+                path = self._by_seq.get(seq)
+                if path is not None and dest in self._entries[path]["dests"]:
+                    self._entries[path]["dests"].remove(dest)
+            if self._lines > self._compact_every + len(self._entries):
+                self._file.close()
+                self._compact()
+
+    def pending(self):
+        """Entries some destination has not acknowledged yet, oldest first."""
+        with self._lock:
+            return [dict(rec) for rec in sorted(self._entries.values(), key=lambda r: r["seq"]) if rec["dests"]]
+
+    def latest_records(self):
+        """doc path -> latest saved data, whether or not it has been delivered."""
+        with self._lock:
+            return {path: rec["data"] for path, rec in self._entries.items()}
+
+    def close(self):
+        with self._lock:
+            self._file.close()
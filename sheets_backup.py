@@ -1,25 +1,220 @@
-import gspread
-from google.oauth2.service_account import Credentials
-import os
+# gspread / google-auth are imported on first use: most reruns never touch Sheets
+import re
+import threading
+import time
+from functools import lru_cache
 
 # Define scope
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
+SERVICE_ACCOUNT_FILE = 'google_sheets_key.json'  # 🟡 Replace with your actual file
+SPREADSHEET_ID = '10utjUxw0Zs8i-W623jaw_Fa6GWLuXT-0fuROK2zGQl4'  # 🟡 Replace with your Sheet ID
+
+# 🔌 One client + worksheet handle per process (token exchange and open_by_key happen once)
+_lock = threading.Lock()
+_service_account_info = None
+_client = None
+_spreadsheet = None
+_worksheets = {}  # tab title (None = first sheet) -> worksheet
+_row_index = {}   # tab title -> {Employee Code: row number}, for upsert mode
+
+# Upsert tabs are wide enough for a 31-day month (identity, totals, Period, 5 fields per day)
+UPSERT_COLUMNS = 10 + 31 * 5
+
+def configure(service_account_info=None):
+    """Use a service-account dict (e.g. SHEETS_KEY) instead of SERVICE_ACCOUNT_FILE."""
+    global _service_account_info
+    with _lock:
+        _service_account_info = service_account_info
+        _reset_locked()
+
+def _reset_locked():
+    global _client, _spreadsheet
+    _client = None
+    _spreadsheet = None
+    _worksheets.clear()
+    _row_index.clear()
+
 # Connect to service account
-def append_to_sheet(data):
-    SERVICE_ACCOUNT_FILE = 'google_sheets_key.json'  # 🟡 Replace with your actual file
-    SPREADSHEET_ID = '10utjUxw0Zs8i-W623jaw_Fa6GWLuXT-0fuROK2zGQl4'  # 🟡 Replace with your Sheet ID
-
-    credentials = Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE,
-        scopes=SCOPES
-    )
-    client = gspread.authorize(credentials)
-    sheet = client.open_by_key(SPREADSHEET_ID).sheet1
-
-    # Convert dict to list of values (ensure consistent column order)
-    ordered_keys = sorted(data.keys())
-    row = [data.get(k, "") for k in ordered_keys]
-
-    # Append to sheet
-    sheet.append_row(row)
+def _get_client():
+    global _client
+    if _client is None:
+        import gspread
+        from google.auth.transport.requests import AuthorizedSession
+        from google.oauth2.service_account import Credentials
+        from requests.adapters import HTTPAdapter
+
+        if _service_account_info:
+            credentials = Credentials.from_service_account_info(_service_account_info, scopes=SCOPES)
+        else:
+            credentials = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+        # AuthorizedSession refreshes the access token on its own; the adapter keeps
+        # keep-alive connections to the Sheets API pooled between calls.
+        session = AuthorizedSession(credentials)
+        session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=8))
+        _client = gspread.Client(auth=credentials, session=session)
+    return _client
+
+def _open_sheet(title=None):
+    """First sheet, or the tab called `title` (created on first use)."""
+    global _spreadsheet
+    with _lock:
+        if title not in _worksheets:
+            if _spreadsheet is None:
+                _spreadsheet = _get_client().open_by_key(SPREADSHEET_ID)
+            if title is None:
+                _worksheets[title] = _spreadsheet.sheet1
+            else:
+                import gspread
+
+                try:
+                    _worksheets[title] = _spreadsheet.worksheet(title)
+                except gspread.WorksheetNotFound:
+                    _worksheets[title] = _spreadsheet.add_worksheet(title, rows=1000, cols=UPSERT_COLUMNS)
+        return _worksheets[title]
+
+def _call_sheet(action, title=None):
+    """Run `action(sheet)`; a failure drops the cached handle so the next call reconnects."""
+    try:
+        return action(_open_sheet(title))
+    except Exception:
+        with _lock:
+            _reset_locked()
+        raise
+
+@lru_cache(maxsize=64)
+def column_order(keys):
+    """Column order for one record schema (a frozenset of keys), computed once per schema."""
+    return tuple(sorted(keys, key=lambda k: (not k.startswith(('Employee', 'OT', 'Period', 'Total')), k)))
+
+def ordered_row(data):
+    """Values in export column order: Employee Code (column A), Name, OT, Period, Totals, days."""
+    return [data.get(k, "") for k in column_order(frozenset(data))]
+
+def append_rows_to_sheet(rows):
+    """Append many record dicts with a single API call."""
+    if rows:
+        _call_sheet(lambda sheet: sheet.append_rows([ordered_row(r) for r in rows]))
+
+def _load_row_index(sheet):
+    """Employee Code -> row number, rebuilt from a single read of column A."""
+    return {str(code): row for row, code in enumerate(sheet.col_values(1), start=1) if code}
+
+def _upsert(sheet, title, rows):
+    index = _row_index.get(title)
+    if index is None or any(str(r.get("Employee Code", "")) not in index for r in rows):
+        # Unknown codes may have been written by another process: re-read before appending
+        index = _row_index[title] = _load_row_index(sheet)
+    updates, new_rows = [], []
+    for r in rows:
+        values = ordered_row(r)
+        values += [""] * (UPSERT_COLUMNS - len(values))  # clear leftovers of longer months
+        row = index.get(str(r.get("Employee Code", "")))
+        if row:
+            updates.append({"range": f"A{row}", "values": [values]})
+        else:
+            new_rows.append((r, values))
+    if updates:
+        sheet.batch_update(updates, value_input_option="RAW")
+    if new_rows:
+        response = sheet.append_rows([values for _, values in new_rows], value_input_option="RAW")
+        match = re.search(r"![A-Z]+(\d+)", (response or {}).get("updates", {}).get("updatedRange", ""))
+        if match:
+            first = int(match.group(1))
+            for offset, (r, _) in enumerate(new_rows):
+                index[str(r.get("Employee Code", ""))] = first + offset
+        else:
+            _row_index.pop(title, None)
+
+def upsert_rows_to_sheet(rows):
+    """
+    Keep exactly one row per employee: existing rows are rewritten in place with
+    one batch_update, unseen employees are appended. Each Period gets its own tab.
+    """
+    by_period = {}
+    for r in rows:
+        by_period.setdefault(str(r.get("Period") or "Attendance"), []).append(r)
+    for title, period_rows in by_period.items():
+        _call_sheet(lambda sheet: _upsert(sheet, title, period_rows), title=title)
+
+def read_rows(title=None, chunk_rows=5000):
+    """
+    Every row of a backup tab, fetched as large ranges in one `batch_get` call.
+
+    Values come back unformatted (numbers as numbers) with trailing empty
+    cells dropped.
+    """
+    def fetch(sheet):
+        from gspread.utils import rowcol_to_a1
+
+        last_col = rowcol_to_a1(1, sheet.col_count)[:-1]
+        ranges = [f"A{start}:{last_col}{min(start + chunk_rows - 1, sheet.row_count)}"
+                  for start in range(1, sheet.row_count + 1, chunk_rows)]
+        if not ranges:
+            return []
+        return [row for block in sheet.batch_get(ranges, value_render_option="UNFORMATTED_VALUE")
+                for row in block]
+
+    rows = _call_sheet(fetch, title=title)
+    for row in rows:
+        while row and row[-1] == "":
+            row.pop()
+    return rows
+
+
+class SheetBackupSink:
+    """
+    Buffers backup rows and writes them with one `append_rows` call.
+
+    A flush only goes out once `max_rows` rows are waiting or the oldest one
+    has waited `max_wait` seconds (or when forced), which keeps month-end data
+    entry well inside the Sheets per-minute write quota. Rows are keyed by
+    document so a record saved twice before a flush is written once.
+    """
+
+    def __init__(self, max_rows=100, max_wait=30.0, writer=None):
+        self._max_rows = max_rows
+        self._max_wait = max_wait
+        self._writer = writer or append_rows_to_sheet
+        self._rows = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def add(self, rows):
+        """Buffer a {key: row dict} mapping; newer rows replace older ones."""
+        with self._lock:
+            if rows and self._oldest is None:
+                self._oldest = time.monotonic()
+            self._rows.update(rows)
+
+    def pending_keys(self):
+        """Keys of the rows still buffered."""
+        with self._lock:
+            return set(self._rows)
+
+    def due(self):
+        with self._lock:
+            return bool(self._rows) and (len(self._rows) >= self._max_rows
+                                         or time.monotonic() - self._oldest >= self._max_wait)
+
+    def flush(self, force=False):
+        """
+        Write buffered rows if a threshold is hit (or `force`) and return the
+        keys written; failed rows stay buffered.
+        """
+        if not (force or self.due()):
+            return []
+        with self._lock:
+            rows, self._rows = self._rows, {}
+            oldest, self._oldest = self._oldest, None
+        if not rows:
+            return []
+        try:
+            self._writer(list(rows.values()))
+        except Exception:
+            with self._lock:
+                for key, row in rows.items():
+                    self._rows.setdefault(key, row)
+                self._oldest = oldest if self._oldest is None else min(oldest, self._oldest)
+            raise
+        return list(rows)
@@ -0,0 +1,98 @@
+# ♻️ Point-in-time restore of a month from the Google Sheets backup into Firestore
+#
+#   python sheets_restore.py --period 2025-07                      # dry run: what would be restored
+#   python sheets_restore.py --period 2025-07 --load               # latest row per employee -> Firestore
+#   python sheets_restore.py --period 2025-07 --until-row 4200 --load   # state as of backup row 4200
+#   python sheets_restore.py --period 2025-07 --tab 2025-07 --load       # upsert-mode backups (one tab per month)
+import argparse
+import json
+
+from backup_restore import firestore_client, load_into_firestore
+from minute_time import format_hhmm
+from record_schema import DAY_FIELDS, IDENTITY_FIELDS, TOTAL_FIELDS
+from sheets_backup import column_order, configure, read_rows
+
+_TIME_FIELDS = ("Check-in", "Check-out")
+
+
+def row_fields(days, with_period=True):
+    """Column names of a backup row for a `days`-day month, in the order `ordered_row` wrote them."""
+    keys = IDENTITY_FIELDS + TOTAL_FIELDS + (["Period"] if with_period else [])
+    keys += [f"{day:02d}_{field}" for day in range(1, days + 1) for field in DAY_FIELDS]
+    return column_order(frozenset(keys))
+
+
+def row_to_record(row):
+    """
+    Map a headerless backup row back to a flat record.
+
+    Rows carry no header, but their columns follow the sorted key order, so
+    the layout is recovered from the length: 10 + 5 per day with Period,
+    9 + 5 per day for rows written before Period was added. Returns None
+    for rows that match neither.
+    """
+    for fixed, with_period in ((10, True), (9, False)):
+        days, rest = divmod(len(row) - fixed, len(DAY_FIELDS))
+        if rest == 0 and 28 <= days <= 31:
+            record = dict(zip(row_fields(days, with_period), row))
+            break
+    else:
+        return None
+    for key, value in record.items():
+        if key.endswith(_TIME_FIELDS) and isinstance(value, (int, float)):
+            record[key] = format_hhmm(round(value * 24 * 60))  # a time cell the sheet turned into a day fraction
+    record["Employee Code"] = str(record["Employee Code"]).strip()
+    return record
+
+
+def latest_records(rows, period=None, until_row=None):
+    """
+    Employee Code -> flat record from the last matching row (rows are in append order).
+
+    `period` keeps only rows of that month (rows without a Period are kept);
+    `until_row` ignores rows below that sheet row (backup tabs are written
+    without gaps, so list position and sheet row agree). Returns (records, skipped).
+    """
+    records, skipped = {}, 0
+    for number, row in enumerate(rows, start=1):
+        if until_row is not None and number > until_row:
+            break
+        if not row:
+            continue
+        record = row_to_record(row)
+        if record is None or not record["Employee Code"]:
+            skipped += 1
+            continue
+        if period and record.setdefault("Period", period) != period:
+            continue
+        records[record["Employee Code"]] = record
+    return records, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restore a month from the Google Sheets backup.")
+    parser.add_argument("--period", required=True, help="month to restore, YYYY-MM")
+    parser.add_argument("--tab", help="backup tab (default: first sheet, as append mode writes)")
+    parser.add_argument("--until-row", type=int, help="point in time: ignore backup rows below this row")
+    parser.add_argument("--load", action="store_true", help="write to Firestore (default: dry run)")
+    parser.add_argument("--sheets-key", help="Sheets service-account JSON (default: sheets_backup.SERVICE_ACCOUNT_FILE)")
+    parser.add_argument("--key", default="firebase_key.json", help="Firebase service-account file")
+    args = parser.parse_args()
+
+    if args.sheets_key:
+        with open(args.sheets_key, encoding="utf-8") as f:
+            configure(json.load(f))
+    rows = read_rows(args.tab)
+    records, skipped = latest_records(rows, args.period, args.until_row)
+    print(f"📄 {len(rows)} backup rows -> {len(records)} employees for {args.period}"
+          f"{f' ({skipped} unreadable rows skipped)' if skipped else ''}")
+    if not args.load or not records:
+        return
+
+    written = load_into_firestore(firestore_client(args.key), args.period, records,
+                                  progress=lambda done, total: print(f"⬆️ {done} / {total}"))
+    print(f"✅ Restored {written} employees into attendance/{args.period}")
+
+
+if __name__ == "__main__":
+    main()
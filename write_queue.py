@@ -0,0 +1,188 @@
+# 📨 Write-behind queue: saves return at once, a background thread batches them out
+import atexit
+import threading
+
+from firebase_admin import firestore
+
+from firestore_bulk import BATCH_LIMIT
+from firestore_sync import WATERMARK_FIELD
+
+
+class WriteBehindQueue:
+    """
+    Coalesces saves per document and flushes them from a daemon thread.
+
+    Firestore writes go out as `WriteBatch` commits of up to 500 docs; Sheets
+    rows are handed to a `SheetBackupSink`, which batches them into
+    `append_rows` calls on its own size/time thresholds. Failed flushes keep
+    their items queued and retry with exponential backoff, so `pending()` only
+    drops once data has really left the process.
+
+    With a `SaveJournal`, every save is journaled before `enqueue()` returns
+    and acknowledged per destination once delivered; saves a crash left
+    unacknowledged are queued again when the next queue starts.
+    """
+
+    def __init__(self, db, sheet_sink=None, flush_interval=2.0, max_backoff=60.0, journal=None):
+        self._db = db
+        self._sheet_sink = sheet_sink
+        self._flush_interval = flush_interval
+        self._max_backoff = max_backoff
+        self._backoff = 0.0
+        self._firestore_pending = {}  # doc path -> merged data
+        self._sheets_pending = {}     # doc path -> latest full row
+        self._replace = set()         # doc paths written without merge
+        self._journal = journal
+        self._seqs = {"firestore": {}, "sheets": {}}  # destination -> doc path -> journal seqs
+        self._sink_seqs = {}          # doc path -> journal seqs of rows handed to the sink
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.last_error = None
+        atexit.register(self.flush)
+        if journal is not None:
+            self._replay(journal.pending())
+
+    def _replay(self, entries):
+        with self._lock:
+            for entry in entries:
+                path = entry["path"]
+                if "firestore" in entry["dests"]:
+                    self._firestore_pending[path] = dict(entry["data"])
+                    if entry["replace"]:
+                        self._replace.add(path)
+                    self._seqs["firestore"].setdefault(path, []).append(entry["seq"])
+                if "sheets" in entry["dests"] and self._sheet_sink is not None:
+                    self._sheets_pending[path] = dict(entry["sheet_row"])
+                    self._seqs["sheets"].setdefault(path, []).append(entry["seq"])
+        if entries:
+            self._ensure_thread()
+
+    def enqueue(self, doc_path, data, sheet_row=None, replace=False):
+        """
+        Queue a write of `data` to `doc_path`; never blocks on the network.
+
+        Writes merge into the stored document unless `replace` is set, in which
+        case the document is overwritten (later merges land on top of it).
+        """
+        seq = None
+        if self._journal is not None:
+            journal_row = None
+            if self._sheet_sink is not None:
+                journal_row = sheet_row if sheet_row is not None else data
+            seq = self._journal.append(doc_path, data, journal_row, replace=replace)
+        with self._lock:
+            if seq is not None:
+                self._seqs["firestore"].setdefault(doc_path, []).append(seq)
+                if self._sheet_sink is not None:
+                    self._seqs["sheets"].setdefault(doc_path, []).append(seq)
+            if replace:
+                self._firestore_pending[doc_path] = dict(data)
+                self._replace.add(doc_path)
+            else:
+                self._firestore_pending.setdefault(doc_path, {}).update(data)
+            if self._sheet_sink is not None:
+                self._sheets_pending[doc_path] = dict(sheet_row if sheet_row is not None
+                                                    else self._firestore_pending[doc_path])
+            if len(self._firestore_pending) >= BATCH_LIMIT:
+                self._wake.set()
+        self._ensure_thread()
+
+    def pending(self):
+        """Counts of writes not yet confirmed, per destination."""
+        with self._lock:
+            sheets = set(self._sheets_pending)
+        if self._sheet_sink is not None:
+            # A doc saved again after a failed Sheets flush is both queued and still in the sink: count it once
+            sheets |= self._sheet_sink.pending_keys()
+        return {"firestore": len(self._firestore_pending), "sheets": len(sheets)}
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._backoff or self._flush_interval)
+            self._wake.clear()
+            self.flush(force=False)
+
+    def _ack(self, dest, seqs):
+        if self._journal is not None and seqs:
+            self._journal.ack(dest, seqs)
+
+    def _requeue(self, items, replace, seqs):
+        # Anything enqueued while we were flushing is newer and wins.
+        with self._lock:
+            for path, path_seqs in seqs.items():
+                self._seqs["firestore"][path] = path_seqs + self._seqs["firestore"].get(path, [])
+            for path, data in items.items():
+                if path in self._replace:
+                    continue  # a newer full overwrite is already queued
+                if path in self._firestore_pending:
+                    self._firestore_pending[path] = {**data, **self._firestore_pending[path]}
+                else:
+                    self._firestore_pending[path] = data
+                if path in replace:
+                    self._replace.add(path)
+
+    def _flush_firestore(self):
+        with self._lock:
+            items, self._firestore_pending = self._firestore_pending, {}
+            replace, self._replace = self._replace, set()
+            seqs, self._seqs["firestore"] = self._seqs["firestore"], {}
+        if self._journal is not None:
+            self._journal.sync()  # one fsync for the whole flush
+        paths = list(items)
+        for start in range(0, len(paths), BATCH_LIMIT):
+            chunk = paths[start:start + BATCH_LIMIT]
+            batch = self._db.batch()
+            for path in chunk:
+                batch.set(self._db.document(path),
+                          {**items[path], WATERMARK_FIELD: firestore.SERVER_TIMESTAMP},
+                          merge=path not in replace)
+            try:
+                batch.commit()
+            except Exception:
+                rest = paths[start:]
+                self._requeue({p: items[p] for p in rest}, replace, {p: seqs[p] for p in rest if p in seqs})
+                raise
+            self._ack("firestore", [seq for p in chunk for seq in seqs.get(p, [])])
+
+    def _flush_sheets(self, force):
+        if self._sheet_sink is None:
+            return
+        with self._lock:
+            items, self._sheets_pending = self._sheets_pending, {}
+            seqs, self._seqs["sheets"] = self._seqs["sheets"], {}
+        for path, path_seqs in seqs.items():
+            self._sink_seqs.setdefault(path, []).extend(path_seqs)
+        self._sheet_sink.add(items)
+        # Only this method (under the flush lock) adds to the sink, so every
+        # seq recorded for a written key belongs to a row that just went out.
+        written = self._sheet_sink.flush(force=force)
+        self._ack("sheets", [seq for path in written for seq in self._sink_seqs.pop(path, [])])
+
+    def flush(self, force=True):
+        """
+        Push what is queued. Returns True when nothing failed.
+
+        The background thread passes force=False so Sheets rows wait for the
+        sink's thresholds; explicit calls (button, reset, exit) send everything.
+        """
+        with self._flush_lock:
+            errors = []
+            for step in (self._flush_firestore, lambda: self._flush_sheets(force)):
+                try:
+                    step()
+                except Exception as e:
+                    errors.append(e)
+            if errors:
+                self.last_error = f"{type(errors[0]).__name__}: {errors[0]}"
+                self._backoff = min(self._max_backoff, max(1.0, self._backoff * 2))
+                return False
+            self.last_error = None
+            self._backoff = 0.0
+            return True